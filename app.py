@@ -2,8 +2,117 @@ import streamlit as st
 from src import utils
 import pandas as pd
 from src.pipelines.prediction_pipeline import PredictionPipeline
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import tempfile
+import os
+import time
+import weakref
 import io
 
+# number of rows scored at a time by the background worker
+CHUNK_SIZE = 10000
+
+# number of rows shown per page of the predictions preview
+PAGE_SIZE = 100
+
+
+@st.cache_resource
+def load_pipeline():
+    """
+    Loads the prediction artifacts once per server process.
+    """
+    pipeline = PredictionPipeline()
+    pipeline.load_artifacts()
+    return pipeline
+
+
+class ScoringSession:
+    """
+    Background worker and current scoring job of one browser session.
+
+    Every session scores on its own worker, so a large upload never queues the jobs of other users.
+    Streamlit 1.36 has no session end hook: the worker is stopped and the csv file of the job deleted
+    when the session state is garbage collected after the session ends, or when the server exits.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.current = {'job': None}
+        weakref.finalize(self, ScoringSession.release, self.executor, self.current)
+
+    @staticmethod
+    def release(executor, current):
+        """
+        Deletes the csv file of the current job and stops the worker.
+        """
+        if current['job'] is not None:
+            discard_job(current['job'])
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def job(self):
+        """
+        The scoring job of the current file, if any.
+        """
+        return self.current['job']
+
+    @job.setter
+    def job(self, job):
+        self.current['job'] = job
+
+
+@st.cache_data(max_entries=4, show_spinner='Reading file...')
+def read_upload(file_hash, _file_bytes):
+    """
+    Parses an upload once; the cache is keyed by the file hash only.
+    """
+    return pd.read_csv(io.BytesIO(_file_bytes))
+
+
+def score_upload(pipeline, df, progress):
+    """
+    Scores df chunk by chunk and streams the predictions to a csv file on disk.
+
+    Only the counts per label are kept in memory. Runs on the background worker,
+    so it must not call any streamlit function.
+    """
+    csv_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False)
+    counts, columns = pd.Series(dtype='int64'), ['Predictions']
+    try:
+        with csv_file:
+            for i, pred in enumerate(pipeline.predict_in_chunks(df, CHUNK_SIZE,
+                                                                lambda done, total: progress.update(done=done, total=total),
+                                                                store=True)):
+                pred.to_csv(csv_file, index=False, header=(i == 0))
+                columns = list(pred.columns)
+                counts = counts.add(pred['Predictions'].value_counts(), fill_value=0)
+    except Exception:
+        os.remove(csv_file.name)
+        raise
+    return {'csv_path': csv_file.name, 'n_rows': len(df), 'columns': columns,
+            'counts': counts.astype('int64').rename_axis('Predictions').rename('count')}
+
+
+def read_page(result, page):
+    """
+    Reads one page of the predictions from the csv file on disk.
+    """
+    return pd.read_csv(result['csv_path'], skiprows=1 + (page - 1) * PAGE_SIZE, nrows=PAGE_SIZE,
+                       header=None, names=result['columns'])
+
+
+def discard_job(job):
+    """
+    Deletes the csv file of a scoring job once it is finished, whether it is still running or not.
+    """
+    def remove_csv(future):
+        if not future.cancelled() and future.exception() is None:
+            os.remove(future.result()['csv_path'])
+
+    job['future'].add_done_callback(remove_csv)
+
+
 # side bar with title
 st.sidebar.title('Wafer Fault Detection')
 
@@ -15,30 +124,67 @@ if st.sidebar.button('About creator'):
 file = st.file_uploader('Upload file', type=['csv', 'txt'])
 
 if file is not None:
-    # Read the uploaded file into a DataFrame
-    df = pd.read_csv(file)
+    # Read the uploaded file into a DataFrame, once per distinct file
+    file_bytes = file.getvalue()
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+    df = read_upload(file_hash, file_bytes)
 
-    # Create an instance of the PredictionPipeline
-    obj = PredictionPipeline()
+    # Only the scoring job of the current file is kept across reruns
+    if 'scoring' not in st.session_state:
+        st.session_state['scoring'] = ScoringSession()
+    session = st.session_state['scoring']
+    job = session.job
+    if job is not None and job['file_hash'] != file_hash:
+        discard_job(job)
+        job = session.job = None
 
     # Only run the prediction when the "Predict" button is clicked
-    if st.button('Predict'):
-        # Predict the outcomes
-        y_pred = obj.predict(df)
-        
-        # Display the predictions
-        st.write(y_pred)
+    if st.button('Predict') and job is None:
+        progress = {'done': 0, 'total': len(df)}
+        future = session.executor.submit(score_upload, load_pipeline(), df, progress)
+        job = session.job = {'file_hash': file_hash, 'future': future, 'progress': progress}
 
-        # Convert predictions to CSV format
-        pred_csv = y_pred.to_csv(index=False).encode('utf-8')
+    if job is not None:
+        future, progress = job['future'], job['progress']
 
-        # Create a file-like object from the bytes data
-        pred_csv_io = io.BytesIO(pred_csv)
+        # Follow the background worker until the predictions are ready
+        progress_bar = st.progress(0.0, text='Predicting...')
+        while not future.done():
+            progress_bar.progress(progress['done'] / max(progress['total'], 1),
+                                  text=f"Predicting... {progress['done']}/{progress['total']} rows")
+            time.sleep(0.2)
+        progress_bar.empty()
 
-        # Provide an option to download the prediction file
+        if future.exception() is not None:
+            # forget the failed job, so the file can be predicted again
+            session.job = None
+            st.error(f'Prediction failed: {future.exception()}')
+            st.stop()
+
+        # Predict the outcomes
+        result = future.result()
+
+        # Display one page of the predictions, read from disk
+        n_pages = max(1, -(-result['n_rows'] // PAGE_SIZE))
+        page = st.number_input(f'Page (of {n_pages})', min_value=1, max_value=n_pages, value=1)
+        st.dataframe(read_page(result, page))
+        st.write(result['counts'])
+
+        # Provide an option to download the prediction file. Streamlit 1.36's download_button
+        # cannot stream from disk: it takes str or bytes, or reads a file object in full, and keeps
+        # the payload in memory. The file is therefore read once per job, not on every rerun.
+        if 'download' not in job:
+            with open(result['csv_path'], 'rb') as pred_csv_io:
+                job['download'] = pred_csv_io.read()
         st.download_button(
             label="Download CSV file",
-            data=pred_csv_io,
+            data=job['download'],
             file_name="predictions.csv",
             mime="text/csv"
-        )
\ No newline at end of file
+        )
+
+elif 'scoring' in st.session_state and st.session_state['scoring'].job is not None:
+    # the file was removed, so its results are no longer needed
+    session = st.session_state['scoring']
+    discard_job(session.job)
+    session.job = None
@@ -0,0 +1,77 @@
+"""
+Cold-start benchmark for the prediction entry point.
+
+Every measurement runs in a fresh python process, so nothing is already imported.
+Run from the project root:
+
+    python benchmarks/cold_start.py --repeats 5
+
+The script exits with status 1 if the median time of a phase misses its target.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# target median time in seconds for each phase
+TARGETS = {
+    'import': 1.0,
+    'import + load artifacts': 3.0,
+}
+
+# heavy packages reported after each phase; only the unpickled model should pull any of them in
+HEAVY_MODULES = ['streamlit', 'xgboost', 'imblearn', 'sklearn.metrics']
+
+PHASE_CODE = {
+    'import': 'from src.pipelines.prediction_pipeline import PredictionPipeline',
+    'import + load artifacts': (
+        'from src.pipelines.prediction_pipeline import PredictionPipeline\n'
+        'PredictionPipeline().load_artifacts()'
+    ),
+}
+
+TIMER = '''
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+def measure(code, repeats):
+    """
+    Runs code in a fresh interpreter repeats times.
+
+    Returns:
+    tuple
+        A tuple containing the list of elapsed times and the heavy modules imported in the last run.
+    """
+    times, heavy = [], []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', TIMER.format(code=code, heavy=HEAVY_MODULES)],
+                             capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(result['elapsed'])
+        heavy = result['heavy']
+    return times, heavy
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cold-start time of the prediction pipeline.')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    missed = False
+    for phase, code in PHASE_CODE.items():
+        times, heavy = measure(code, args.repeats)
+        median = statistics.median(times)
+        status = 'OK' if median <= TARGETS[phase] else 'MISSED'
+        missed |= status == 'MISSED'
+        print(f'{phase:<25} median {median:.3f}s  min {min(times):.3f}s  target {TARGETS[phase]:.1f}s  {status}')
+        print(f'{"":<25} heavy modules imported: {", ".join(heavy) or "none"}')
+
+    sys.exit(1 if missed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Accuracy check of the streaming preprocessor against exact statistics.
+
+Fits the streaming imputer and scaler chunk by chunk on synthetic sensor data, once in a single
+pass and once as two halves merged together, and compares their statistics with the exact ones.
+Run from the project root:
+
+    python benchmarks/streaming_statistics.py --rows 200000
+
+The script exits with status 1 if the largest error, relative to the interquartile range, misses its target.
+"""
+import argparse
+import os
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+
+# make the project root importable when run as benchmarks/streaming_statistics.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.components.data_transformation import DataTransformation
+
+# largest error of a statistic, relative to the exact interquartile range of its column. Most columns
+# stay below 1e-4; the median of 'bimodal' falls between its modes, where few rows move it further
+TARGET = 0.02
+
+def make_sensors(n_rows, seed=0):
+    """
+    Synthetic sensor readings with the shapes of the wafer data: skewed and heavy-tailed columns,
+    columns dominated by a single value, and missing values.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {
+        'normal': rng.normal(100, 5, n_rows),
+        'lognormal': rng.lognormal(0, 1, n_rows),
+        'heavy_tail': rng.standard_t(2, n_rows),
+        'mostly_zero': np.where(rng.random(n_rows) < 0.7, 0.0, rng.exponential(1, n_rows)),
+        'discrete': rng.integers(0, 5, n_rows).astype(float),
+        'bimodal': np.where(rng.random(n_rows) < 0.5, rng.normal(-3, 1, n_rows), rng.normal(3, 1, n_rows)),
+    }
+    X = pd.DataFrame(columns)
+    X = X.mask(rng.random(X.shape) < 0.1)
+    return X
+
+def chunks(X, chunk_size):
+    """
+    Splits X into chunks of chunk_size rows.
+    """
+    return (X.iloc[start:start + chunk_size] for start in range(0, len(X), chunk_size))
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the streaming preprocessor against exact statistics.')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    data_transformation = DataTransformation()
+    X = make_sensors(args.rows)
+
+    one_pass = data_transformation.fit_streaming_preprocessor(chunks(X, args.chunk_size))
+
+    # two workers fit half of the rows each, then their statistics are merged
+    half = len(X) // 2
+    merged = data_transformation.data_transformation_obj(streaming=True)
+    other = data_transformation.data_transformation_obj(streaming=True)
+    for chunk in chunks(X.iloc[:half], args.chunk_size):
+        data_transformation.partial_fit_preprocessor(merged, chunk)
+    for chunk in chunks(X.iloc[half:], args.chunk_size):
+        data_transformation.partial_fit_preprocessor(other, chunk)
+    data_transformation.merge_preprocessors(merged, other)
+    data_transformation.finalize_preprocessor(merged)
+
+    missed = False
+    for name, preprocessing_obj in (('one pass', one_pass), ('merged halves', merged)):
+        errors = data_transformation.compare_with_exact(preprocessing_obj, X)
+        largest = max(errors.values())
+        status = 'OK' if largest <= TARGET else 'MISSED'
+        missed |= status == 'MISSED'
+        print(f'{name:<15} ' + '  '.join(f'{key} {value:.2e}' for key, value in errors.items())
+              + f'  target {TARGET:.0e}  {status}')
+
+    sys.exit(1 if missed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import os, sys
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from src.logger import Logger
+from src.run_config import RunConfig
 from dataclasses import dataclass
 from sklearn.model_selection import train_test_split
 
@@ -10,6 +12,8 @@ class DataIngestionConfig:
     Configuration for data ingestion
 
     Attributes:
+        raw_data_folder: str
+            Path to the folder with the raw wafer files.
         raw_data_path: str
             Path to the raw data csv file.
         train_data_path: str
@@ -20,6 +24,7 @@ class DataIngestionConfig:
     """
     # paths for raw processed data, train and test data
     data_folder = os.path.join('../data')
+    raw_data_folder = os.path.join(data_folder, 'raw_data')
     processed_data_folder = os.path.join(data_folder, 'processed_data')
     raw_data_path = os.path.join(processed_data_folder, 'raw_data_processed.csv')
     train_data_path = os.path.join(processed_data_folder, 'train.csv')
@@ -31,8 +36,8 @@ class DataIngestion:
 
     Methods:
     --------
-    __init__():
-        Initializes DataIngestion class with configuration and logger.
+    __init__(run_config=None):
+        Initializes DataIngestion class with configuration, run configuration and logger.
 
     load_data(path_to_folder, file_format = '.csv'):
         Loads all files of a given format from the specified folder into a single dataframe
@@ -46,22 +51,29 @@ class DataIngestion:
     drop_columns(df):
         Drops columns with zero standard deviation and missing values exceeding the given threshold.
 
-    initiate_data_ingestion(path_to_files, file_format='.csv'):
+    initiate_data_ingestion(path_to_files=None, file_format='.csv'):
         Initiates data ingestion including loading, cleaning, splitting and saving the data.         
 
     """
 
-    def __init__(self):
+    def __init__(self, run_config=None):
         """
         Initializes the DataIngestion class with the configuration for data paths.
+
+        Args:
+        run_config: RunConfig, optional (default=None)
+            Run-level configuration with the seed used for splitting. A default RunConfig is used if None.
         """
         self.ingestion_config = DataIngestionConfig()
+        self.run_config = run_config if run_config is not None else RunConfig()
         self.logger = Logger()    
 
     def load_data(self, path_to_folder, file_format = '.csv'):
         """
         Loads all files of a given format from the specified folder into a single dataframe.
 
+        The files are read concurrently, within the cpu budget of the run.
+
         Args:
         path_to_folder: str
             Path to the folder containing data files.
@@ -85,10 +97,11 @@ class DataIngestion:
             all_files = os.listdir(path_to_folder)
 
             # filter csv files
-            csv_files = [file for file in all_files if file.endswith(file_format)]
+            csv_files = sorted(file for file in all_files if file.endswith(file_format))
 
-            # read each csv file and store them in a list of dataframes
-            dfs = [pd.read_csv(os.path.join(path_to_folder, file)) for file in csv_files] 
+            # read each csv file and store them in a list of dataframes, keeping the order of the files
+            with ThreadPoolExecutor(max_workers=self.run_config.cpu_budget) as executor:
+                dfs = list(executor.map(lambda file: pd.read_csv(os.path.join(path_to_folder, file)), csv_files))
 
             # concatenate all dataframes into single dataframe
             df = pd.concat(dfs, ignore_index=True)
@@ -208,13 +221,13 @@ class DataIngestion:
             self.logger.log('Error in dropping the columns from dataframe', 'ERROR')
             raise e
         
-    def initiate_data_ingestion(self, path_to_files, file_format='.csv'):
+    def initiate_data_ingestion(self, path_to_files=None, file_format='.csv'):
         """
         Initiates data ingestion including loading, cleaning, splitting and saving the data.
 
         Args:
-        path_to_files: str
-            Path to the folder contining data files.
+        path_to_files: str, optional (default=None)
+            Path to the folder contining data files. The configured raw data folder is used if None.
         file_format: str, optional (default='.csv')
             File format to filter files.
 
@@ -231,6 +244,8 @@ class DataIngestion:
             self.logger.log('Data ingestion initialized...', 'INFO')
 
             # load the files from the path
+            if path_to_files is None:
+                path_to_files = self.ingestion_config.raw_data_folder
             df = self.load_data(path_to_files, file_format=file_format)
 
             # drop the 'Unnamed: 0' column if it exists
@@ -249,7 +264,7 @@ class DataIngestion:
 
             # split the data into train and test set
             self.logger.log('Splitting the data into train and test set...', 'INFO')
-            train_data, test_data = train_test_split(df, test_size=0.2, random_state=42)
+            train_data, test_data = train_test_split(df, test_size=0.2, random_state=self.run_config.seed)
             self.logger.log('Completed splitting the data into train and test set', 'INFO')
 
             # make directory for train data
@@ -3,9 +3,15 @@ from sklearn.preprocessing import RobustScaler
 from sklearn.impute import KNNImputer
 from src.logger import Logger
 from src.utils import save_obj
+from src.run_config import RunConfig
+from src.components.streaming_preprocessing import StreamingMedianImputer, StreamingRobustScaler
 from imblearn.combine import SMOTETomek
+from imblearn.over_sampling import SMOTE
+from imblearn.under_sampling import TomekLinks
+from sklearn.neighbors import NearestNeighbors
 from dataclasses import dataclass
 import os, sys
+import numpy as np
 import pandas as pd
 
 @dataclass
@@ -18,12 +24,26 @@ class DataTransformationConfig:
             Path to the preprocessor pickle file.
         used_features: str
             Path to the features used file.
+        imputer_data_path: str
+            Path to the csv file with the rows the KNN imputer was fitted on, the neighbours
+            that a model refresh extends.
+        streaming_preprocessing: bool
+            Whether the preprocessor is a median imputer and a robust scaler fitted in one pass
+            with quantile sketches, instead of a KNN imputer and an exact robust scaler.
+        streaming_chunk_size: int
+            Number of rows read at a time when fitting the streaming preprocessor.
+        check_streaming_statistics: bool
+            Whether the streaming statistics are checked against exact ones after fitting.
 
     """
 
     # paths for preprocessor, and used features
     preprocessor_file_path = os.path.join('../artifacts', 'preprocessor.pkl')
     used_features = os.path.join('../artifacts', 'features.pkl')
+    imputer_data_path = os.path.join('../artifacts', 'imputer_neighbours.csv')
+    streaming_preprocessing = False
+    streaming_chunk_size = 10000
+    check_streaming_statistics = False
 
 class DataTransformation:
     """
@@ -31,12 +51,27 @@ class DataTransformation:
 
     Methods:
     --------
-    __init__():
-        Initializes DataTransformation class with configuration and logger.
+    __init__(run_config=None):
+        Initializes DataTransformation class with configuration, run configuration and logger.
 
-    data_transformation_obj():
+    data_transformation_obj(streaming=False):
         Creates a preprocessing pipeline object with imputer and scaler.
 
+    partial_fit_preprocessor(preprocessing_obj, X):
+        Adds a chunk of rows to the statistics of a streaming preprocessing pipeline.
+
+    merge_preprocessors(preprocessing_obj, other):
+        Merges the statistics of a streaming preprocessing pipeline fitted on other rows.
+
+    finalize_preprocessor(preprocessing_obj):
+        Completes the scaler statistics of a streaming preprocessing pipeline with the imputed values.
+
+    fit_streaming_preprocessor(chunks):
+        Fits a streaming preprocessing pipeline in one pass over chunks of features data.
+
+    compare_with_exact(preprocessing_obj, X):
+        Measures the error of the streaming statistics against the exact ones.
+
     resample_data():
         Resamples the data using SMOTETomek to deal with class imbalance.
 
@@ -45,21 +80,31 @@ class DataTransformation:
 
     """
 
-    def __init__(self):
+    def __init__(self, run_config=None):
         """
         Initializes the DataTransformation class with the configuration and logger.
+
+        Args:
+        run_config: RunConfig, optional (default=None)
+            Run-level configuration with the seed and thread count used for resampling. A default RunConfig is used if None.
         """
         self.data_transformation_config = DataTransformationConfig()
+        self.run_config = run_config if run_config is not None else RunConfig()
         self.logger = Logger()
 
     # data transformation object with imputer and scaler
-    def data_transformation_obj(self):   
+    def data_transformation_obj(self, streaming=False):   
         """
         Creates a preprocessing pipeline object with imputer and scaler.
 
+        Args:
+        streaming: bool, optional (default=False)
+            Whether to use a median imputer and a robust scaler based on mergeable quantile sketches.
+
         Returns:
         preprocessing_pipeline: Pipeline
-            A scikit-learn pipeline object that includes KNN imputer and Robust scaler.
+            A scikit-learn pipeline object that includes KNN imputer and Robust scaler,
+            or their streaming counterparts.
 
         Raises:
         Exception
@@ -67,12 +112,20 @@ class DataTransformation:
         """
         try:  
             self.logger.log('Creating preprocessing pipeline...')
-            preprocessing_pipeline = Pipeline(
-                steps=[
-                    ('imputer', KNNImputer(n_neighbors=3)),
-                    ('scaler', RobustScaler())
-                ]
-            )  
+            if streaming:
+                preprocessing_pipeline = Pipeline(
+                    steps=[
+                        ('imputer', StreamingMedianImputer()),
+                        ('scaler', StreamingRobustScaler())
+                    ]
+                )
+            else:
+                preprocessing_pipeline = Pipeline(
+                    steps=[
+                        ('imputer', KNNImputer(n_neighbors=3)),
+                        ('scaler', RobustScaler())
+                    ]
+                )  
             self.logger.log('Preprocessing pipeline created succesfully.')
             return preprocessing_pipeline
         
@@ -80,7 +133,132 @@ class DataTransformation:
             self.logger.log('Error occurred while creating preprocessing pipeline', 'ERROR')
             raise e
 
-    
+    def partial_fit_preprocessor(self, preprocessing_obj, X):
+        """
+        Adds a chunk of rows to the statistics of a streaming preprocessing pipeline.
+
+        Imputer and scaler both see the raw chunk; the scaler learns about the imputed
+        values in finalize_preprocessor, so a single pass is enough.
+
+        Args:
+        preprocessing_obj: Pipeline
+            A streaming preprocessing pipeline.
+        X: pd.DataFrame
+            A chunk of features data.
+
+        Returns:
+        Pipeline
+            The preprocessing pipeline.
+        """
+        preprocessing_obj.named_steps['imputer'].partial_fit(X)
+        preprocessing_obj.named_steps['scaler'].partial_fit(X)
+        return preprocessing_obj
+
+    def merge_preprocessors(self, preprocessing_obj, other):
+        """
+        Merges the statistics of a streaming preprocessing pipeline fitted on other rows, e.g. by another worker.
+
+        Both pipelines must not be finalized yet.
+
+        Args:
+        preprocessing_obj: Pipeline
+            A streaming preprocessing pipeline.
+        other: Pipeline
+            A streaming preprocessing pipeline fitted on the same columns.
+
+        Returns:
+        Pipeline
+            The merged preprocessing pipeline.
+        """
+        for step in ('imputer', 'scaler'):
+            preprocessing_obj.named_steps[step].merge(other.named_steps[step])
+        return preprocessing_obj
+
+    def finalize_preprocessor(self, preprocessing_obj):
+        """
+        Completes the scaler statistics of a streaming preprocessing pipeline with the imputed values.
+
+        Args:
+        preprocessing_obj: Pipeline
+            A streaming preprocessing pipeline fitted on all the chunks.
+
+        Returns:
+        Pipeline
+            The preprocessing pipeline, ready to transform.
+        """
+        medians = preprocessing_obj.named_steps['imputer'].statistics_
+        preprocessing_obj.named_steps['scaler'].account_for_imputation(medians)
+        return preprocessing_obj
+
+    def fit_streaming_preprocessor(self, chunks):
+        """
+        Fits a streaming preprocessing pipeline in one pass over chunks of features data.
+
+        Args:
+        chunks: iterable
+            Chunks of features data as pd.DataFrame.
+
+        Returns:
+        Pipeline
+            The fitted preprocessing pipeline.
+
+        Raises:
+        Exception
+            If any error occurs while fitting the preprocessing pipeline.
+        """
+        try:
+            self.logger.log('Fitting streaming preprocessing pipeline...')
+            preprocessing_obj = self.data_transformation_obj(streaming=True)
+
+            n_rows = 0
+            for X in chunks:
+                self.partial_fit_preprocessor(preprocessing_obj, X)
+                n_rows += len(X)
+
+            self.finalize_preprocessor(preprocessing_obj)
+            self.logger.log(f'Streaming preprocessing pipeline fitted on {n_rows} rows.')
+            return preprocessing_obj
+
+        except Exception as e:
+            self.logger.log('Error occurred while fitting streaming preprocessing pipeline', 'ERROR')
+            raise e
+
+    def compare_with_exact(self, preprocessing_obj, X):
+        """
+        Measures the error of the streaming statistics against the exact ones.
+
+        Errors are relative to the exact interquartile range of each column and the largest one is reported.
+        The exact statistics sort every column of X, so the check is opt-in.
+
+        Args:
+        preprocessing_obj: Pipeline
+            A fitted streaming preprocessing pipeline.
+        X: pd.DataFrame
+            The features data the pipeline was fitted on.
+
+        Returns:
+        dict
+            The largest relative error of the imputer medians, the scaler centers and the scaler scales.
+        """
+        imputer = preprocessing_obj.named_steps['imputer']
+        scaler = preprocessing_obj.named_steps['scaler']
+
+        X_raw = X.to_numpy(dtype=float)
+        X_imputed = imputer.transform(X)
+        q_min, q_max = scaler.quantile_range
+        exact_low, exact_center, exact_high = np.percentile(X_imputed, [q_min, 50, q_max], axis=0)
+        exact_scale = exact_high - exact_low
+        exact_scale[exact_scale == 0] = 1.0
+
+        with np.errstate(invalid='ignore'):
+            errors = {
+                'imputer_median': np.nanmax(np.abs(imputer.statistics_ - np.nanmedian(X_raw, axis=0)) / exact_scale),
+                'scaler_center': np.nanmax(np.abs(scaler.center_ - exact_center) / exact_scale),
+                'scaler_scale': np.nanmax(np.abs(scaler.scale_ - exact_scale) / exact_scale),
+            }
+        self.logger.log(f'Largest relative error of the streaming statistics: {errors}')
+        return errors
+
     # resampling using SMOTETomek
     def resample_data(self, df):
         """
@@ -105,8 +283,11 @@ class DataTransformation:
             # separate features and target variable
             X, Y = df.drop('Good/Bad', axis=1), df['Good/Bad']
 
-            # initialize SMOTETomek
-            resampler = SMOTETomek(sampling_strategy='auto')
+            # initialize SMOTETomek, SMOTE's neighbour search carries the thread count since its n_jobs is deprecated
+            smote = SMOTE(sampling_strategy='auto', random_state=self.run_config.seed,
+                          k_neighbors=NearestNeighbors(n_neighbors=6, n_jobs=self.run_config.n_jobs))
+            tomek = TomekLinks(sampling_strategy='all', n_jobs=self.run_config.n_jobs)
+            resampler = SMOTETomek(smote=smote, tomek=tomek, random_state=self.run_config.seed)
             X_resampled, Y_resampled = resampler.fit_resample(X,Y)
 
             # combine the resampled features and target into a dataframe
@@ -142,8 +323,15 @@ class DataTransformation:
 
         try:
             self.logger.log('Starting data transformation...')
+            streaming = self.data_transformation_config.streaming_preprocessing
+
             # get preprocessing object
-            preprocessing_obj = self.data_transformation_obj()
+            if streaming:
+                # fit the preprocessing object in one pass over the train data
+                chunks = pd.read_csv(train_data_path, chunksize=self.data_transformation_config.streaming_chunk_size)
+                preprocessing_obj = self.fit_streaming_preprocessor(chunk.drop('Good/Bad', axis=1) for chunk in chunks)
+            else:
+                preprocessing_obj = self.data_transformation_obj()
 
             # read in train data and test data
             train_data = pd.read_csv(train_data_path)
@@ -157,7 +345,12 @@ class DataTransformation:
 
             # transform train data
             self.logger.log('Transforming training data...')
-            train_data_trans = preprocessing_obj.fit_transform(X_train)
+            if streaming:
+                train_data_trans = preprocessing_obj.transform(X_train)
+                if self.data_transformation_config.check_streaming_statistics:
+                    self.compare_with_exact(preprocessing_obj, X_train)
+            else:
+                train_data_trans = preprocessing_obj.fit_transform(X_train)
             train_data_trans = pd.DataFrame(train_data_trans, columns=X_train.columns)
             train_data_trans['Good/Bad'] = Y_train
 
@@ -177,6 +370,11 @@ class DataTransformation:
             # save the used features
             self.logger.log('Saving used features...')
             save_obj(self.data_transformation_config.used_features, obj=preprocessing_obj.get_feature_names_out())
+
+            # save the neighbours of the KNN imputer
+            if not streaming:
+                self.logger.log('Saving imputer neighbours...')
+                X_train.to_csv(self.data_transformation_config.imputer_data_path, index=False, header=True)
             
             self.logger.log('Data transformation completed successfully.')
             return (train_data_resampled, test_data_trans)
@@ -0,0 +1,261 @@
+from src.logger import Logger
+from src.run_config import RunConfig
+from src.components.training_scheduler import MULTI_THREADED_MODELS
+from threadpoolctl import threadpool_limits
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import os, sys
+import json
+import time
+import numpy as np
+import pandas as pd
+
+@dataclass
+class ModelEvaluatorConfig:
+    """
+    Configuration for model evaluation
+
+    Attributes:
+        report_file_path: str
+            Path to the evaluation report json file.
+        thresholds: list
+            Probability thresholds of the confusion matrices.
+        chunk_size: int
+            Number of rows scored at a time.
+        n_bootstrap: int
+            Number of bootstrap resamples of the confidence intervals.
+        bootstrap_memory_mb: int
+            Memory cap of the bootstrap resamples computed at once, which sets how many fit in a block.
+        confidence_level: float
+            Confidence level of the intervals.
+        calibration_bins: int
+            Number of bins of the calibration curves.
+
+    """
+    report_file_path = os.path.join('../artifacts', 'evaluation_report.json')
+    thresholds = [0.3, 0.5, 0.7]
+    chunk_size = 10000
+    n_bootstrap = 1000
+    bootstrap_memory_mb = 256
+    confidence_level = 0.95
+    calibration_bins = 10
+
+class ModelEvaluator:
+    """
+    A class to evaluate trained models on large test sets and write an evaluation report.
+
+    Methods:
+    --------
+    __init__(run_config=None):
+        Initializes ModelEvaluator with configuration, run configuration and logger.
+
+    predict_proba_in_chunks(model, X):
+        Scores the test set in chunks on parallel threads and measures the throughput.
+
+    bootstrap_intervals(Y, proba):
+        Computes bootstrap confidence intervals of AUC-ROC and PR-AUC with vectorized resampling.
+
+    evaluate(Y, proba, lots=None):
+        Computes AUC-ROC, PR-AUC, confusion matrices, calibration curve and per-lot breakdown.
+
+    initiate_model_evaluation(models, X_test, Y_test, lots=None):
+        Evaluates every model and saves the report.
+
+    """
+
+    def __init__(self, run_config=None):
+        """
+        Initializes ModelEvaluator with configuration, run configuration and logger.
+
+        Args:
+        run_config: RunConfig, optional (default=None)
+            Run-level configuration with the seed and cpu budget. A default RunConfig is used if None.
+        """
+        self.model_evaluator_config = ModelEvaluatorConfig()
+        self.run_config = run_config if run_config is not None else RunConfig()
+        self.logger = Logger()
+
+    def predict_proba_in_chunks(self, model, X):
+        """
+        Scores the test set in chunks on parallel threads and measures the throughput.
+
+        A multi-threaded model keeps the thread count it was trained with, so fewer chunks are scored
+        at once and the cpu budget is never exceeded.
+
+        Args:
+        model: object
+            The trained model.
+        X: pd.DataFrame
+            Test features.
+
+        Returns:
+        tuple
+            A tuple containing the probabilities of the faulty class and the rows scored per second.
+        """
+        chunk_size = self.model_evaluator_config.chunk_size
+        chunks = [X.iloc[start:start + chunk_size] for start in range(0, len(X), chunk_size)]
+
+        threads = self.run_config.n_jobs if type(model).__name__ in MULTI_THREADED_MODELS else 1
+        workers = max(1, self.run_config.cpu_budget // threads)
+
+        start = time.perf_counter()
+        with threadpool_limits(limits=threads), ThreadPoolExecutor(max_workers=workers) as executor:
+            proba = list(executor.map(lambda chunk: model.predict_proba(chunk)[:, 1], chunks))
+        elapsed = time.perf_counter() - start
+
+        proba = np.concatenate(proba) if proba else np.empty(0)
+        return proba, len(X) / elapsed if elapsed > 0 else float('inf')
+
+    def bootstrap_intervals(self, Y, proba):
+        """
+        Computes bootstrap confidence intervals of AUC-ROC and PR-AUC with vectorized resampling.
+
+        Every resample is a row of multinomial counts over the test rows. Rows are sorted once by
+        probability, so each block of resamples needs only cumulative sums over the sorted counts.
+        A block holds about ten arrays of 8 bytes per test row and resample, so its size follows from
+        the number of rows and the memory cap.
+
+        Args:
+        Y: np.ndarray
+            Target encoded as 0/1.
+        proba: np.ndarray
+            Probabilities of the faulty class.
+
+        Returns:
+        dict
+            Lower and upper bounds of AUC-ROC and PR-AUC.
+        """
+        config = self.model_evaluator_config
+        n_rows = len(Y)
+        rng = np.random.default_rng(self.run_config.spawn_seeds(1)[0])
+        block_size = int(max(1, min(config.n_bootstrap, config.bootstrap_memory_mb * 2**20 // (10 * 8 * max(n_rows, 1)))))
+
+        # group rows with equal probabilities, highest first
+        order = np.argsort(-proba, kind='mergesort')
+        sorted_proba, sorted_Y = proba[order], Y[order]
+        starts = np.flatnonzero(np.r_[True, sorted_proba[1:] != sorted_proba[:-1]])
+
+        aucs, pr_aucs = [], []
+        for block_start in range(0, config.n_bootstrap, block_size):
+            n_block = min(block_size, config.n_bootstrap - block_start)
+            counts = rng.multinomial(n_rows, np.full(n_rows, 1.0 / n_rows), size=n_block)[:, order]
+
+            pos = np.add.reduceat(counts * sorted_Y, starts, axis=1).astype(float)
+            neg = np.add.reduceat(counts * (1 - sorted_Y), starts, axis=1).astype(float)
+            total_pos, total_neg = pos.sum(axis=1), neg.sum(axis=1)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                # AUC-ROC: positives outrank the negatives below them, ties count half
+                neg_below = total_neg[:, None] - np.cumsum(neg, axis=1)
+                aucs.append((pos * (neg_below + 0.5 * neg)).sum(axis=1) / (total_pos * total_neg))
+
+                # PR-AUC as average precision: precision at each threshold weighted by the recall gained
+                tp, fp = np.cumsum(pos, axis=1), np.cumsum(neg, axis=1)
+                precision = np.divide(tp, tp + fp, out=np.zeros_like(tp), where=(tp + fp) > 0)
+                pr_aucs.append((pos * precision).sum(axis=1) / total_pos)
+
+        alpha = (1 - config.confidence_level) / 2
+        bounds = {}
+        for name, values in (('auc_roc', np.concatenate(aucs)), ('pr_auc', np.concatenate(pr_aucs))):
+            values = values[~np.isnan(values)]
+            low, high = np.quantile(values, [alpha, 1 - alpha]) if len(values) else (np.nan, np.nan)
+            bounds[name] = {'low': float(low), 'high': float(high)}
+        return bounds
+
+    def evaluate(self, Y, proba, lots=None):
+        """
+        Computes AUC-ROC, PR-AUC, confusion matrices, calibration curve and per-lot breakdown.
+
+        Args:
+        Y: np.ndarray
+            Target encoded as 0/1.
+        proba: np.ndarray
+            Probabilities of the faulty class.
+        lots: np.ndarray, optional (default=None)
+            Lot of every row.
+
+        Returns:
+        dict
+            The metrics.
+        """
+        from sklearn.metrics import roc_auc_score, average_precision_score, confusion_matrix
+        from sklearn.calibration import calibration_curve
+
+        config = self.model_evaluator_config
+        metrics = {
+            'auc_roc': float(roc_auc_score(Y, proba)),
+            'pr_auc': float(average_precision_score(Y, proba)),
+            'confidence_intervals': self.bootstrap_intervals(Y, proba),
+            'confusion_matrices': {},
+        }
+
+        for threshold in config.thresholds:
+            tn, fp, fn, tp = confusion_matrix(Y, (proba >= threshold).astype(int), labels=[0, 1]).ravel()
+            metrics['confusion_matrices'][str(threshold)] = {'tn': int(tn), 'fp': int(fp), 'fn': int(fn), 'tp': int(tp)}
+
+        prob_true, prob_pred = calibration_curve(Y, proba, n_bins=config.calibration_bins)
+        metrics['calibration_curve'] = {'mean_predicted': prob_pred.tolist(), 'fraction_positive': prob_true.tolist()}
+
+        if lots is not None:
+            metrics['lots'] = {}
+            frame = pd.DataFrame({'lot': lots, 'Y': Y, 'proba': proba})
+            for lot, group in frame.groupby('lot'):
+                metrics['lots'][str(lot)] = {
+                    'rows': int(len(group)),
+                    'positive_rate': float(group['Y'].mean()),
+                    'auc_roc': float(roc_auc_score(group['Y'], group['proba'])) if group['Y'].nunique() == 2 else None,
+                }
+
+        return metrics
+
+    def initiate_model_evaluation(self, models, X_test, Y_test, lots=None):
+        """
+        Evaluates every model and saves the report.
+
+        Args:
+        models: dict
+            Dictionary with model names as keys and fitted model instances as values.
+        X_test: pd.DataFrame
+            Test features.
+        Y_test: pd.Series
+            Test target.
+        lots: pd.Series, optional (default=None)
+            Lot of every test row.
+
+        Returns:
+        dict
+            A dictionary with model names as keys and their metrics as values.
+
+        Raises:
+        Exception
+            If any error occurs during evaluation.
+        """
+        try:
+            self.logger.log('Starting model evaluation report...')
+
+            # replace target variables for binary classification
+            Y = Y_test.replace({-1:0, 1:1}).to_numpy()
+            lots = None if lots is None else np.asarray(lots)
+            report = {}
+
+            for name, model in models.items():
+                proba, throughput = self.predict_proba_in_chunks(model, X_test)
+                report[name] = self.evaluate(Y, proba, lots)
+                report[name]['rows_per_second'] = throughput
+
+                intervals = report[name]['confidence_intervals']['auc_roc']
+                self.logger.log(f"Model: {name}, AUC-ROC: {report[name]['auc_roc']:.4f} "
+                                f"[{intervals['low']:.4f}, {intervals['high']:.4f}], "
+                                f"PR-AUC: {report[name]['pr_auc']:.4f}, {throughput:.0f} rows/s")
+
+            report_path = self.model_evaluator_config.report_file_path
+            os.makedirs(os.path.dirname(report_path), exist_ok=True)
+            with open(report_path, 'w') as report_file:
+                json.dump(report, report_file, indent=4)
+
+            self.logger.log(f'Saved evaluation report under {report_path}')
+            return report
+
+        except Exception as e:
+            self.logger.log('Error occurred during model evaluation report', 'ERROR')
+            raise e
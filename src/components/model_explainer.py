@@ -0,0 +1,287 @@
+from src.logger import Logger
+from dataclasses import dataclass
+import os, sys
+import time
+import numpy as np
+import pandas as pd
+
+@dataclass
+class ModelExplainerConfig:
+    """
+    Configuration for model explanations
+
+    Attributes:
+        top_k: int
+            Number of sensors reported per wafer.
+
+    """
+    top_k = 5
+
+class ModelExplainer:
+    """
+    A class to compute per-wafer sensor attributions of a trained model in batch.
+
+    XGBoost uses its native TreeSHAP. Random forest, AdaBoost and both gradient boosting models use
+    path attributions, where every split on the path of a wafer credits its sensor with the change
+    of the node value. Logistic regression attributes coef * (x - background). The attributions of a
+    wafer add up to its model output minus the expected value: a probability for random forest, the
+    decision function for AdaBoost, log-odds otherwise. TreeSHAP and path attributions distribute
+    the output differently, so attributions of different model types are not comparable.
+
+    Methods:
+    --------
+    __init__(model, features, background=None):
+        Initializes ModelExplainer and caches the background statistics of the model.
+
+    supported(model):
+        Tells whether attributions can be computed for a model.
+
+    attributions(X):
+        Computes the attribution of every sensor for every wafer.
+
+    top_sensors(X, top_k=None):
+        Returns the sensors with the largest absolute attributions for every wafer.
+
+    """
+
+    def __init__(self, model, features, background=None):
+        """
+        Initializes ModelExplainer and caches the background statistics of the model.
+
+        The statistics (node value changes per split, expected value) are computed once here,
+        so each batch only costs a sparse product per model.
+
+        Args:
+        model: object
+            The trained model.
+        features: list
+            Names of the sensors, in the order of the model input.
+        background: np.ndarray, optional (default=None)
+            Reference preprocessed wafer for the linear path. Defaults to zeros, which is the
+            median wafer after robust scaling.
+        """
+        self.model = model
+        self.features = list(features)
+        self.explainer_config = ModelExplainerConfig()
+        self.logger = Logger()
+        self.model_class = type(model).__name__
+
+        if not self.supported(model):
+            raise ValueError(f'Attributions are not supported for {self.model_class}')
+
+        start = time.perf_counter()
+        n_features = len(self.features)
+        self.background = np.zeros(n_features) if background is None else np.asarray(background, dtype=float)
+
+        if self.model_class == 'RandomForestClassifier':
+            # one matrix for the whole forest, matching the node order of forest.decision_path
+            from scipy import sparse
+
+            deltas = [self._node_deltas(tree.tree_, self._class_one_fraction(tree.tree_)) for tree in model.estimators_]
+            self.node_deltas = sparse.vstack(deltas).tocsr() / len(model.estimators_)
+            self.expected_value = float(np.mean([self._class_one_fraction(tree.tree_)[0] for tree in model.estimators_]))
+
+        elif self.model_class in ('GradientBoostingClassifier', 'AdaBoostClassifier',
+                                  'HistGradientBoostingClassifier'):
+            if self.model_class == 'GradientBoostingClassifier':
+                self.trees = list(model.estimators_[:, 0])
+                self.node_deltas = [self._node_deltas(tree.tree_, tree.tree_.value[:, 0, 0] * model.learning_rate)
+                                    for tree in self.trees]
+            elif self.model_class == 'AdaBoostClassifier':
+                self.trees = list(model.estimators_)
+                self.node_deltas = [self._node_deltas(tree.tree_, self._adaboost_node_values(tree.tree_, weight))
+                                    for tree, weight in zip(self.trees, model.estimator_weights_)]
+            else:
+                # one predictor per iteration for a binary target, read from the private _predictors
+                # of scikit-learn, whose layout is only checked against the pinned version
+                predictors = getattr(model, '_predictors', None)
+                fields = {'value', 'feature_idx', 'num_threshold', 'missing_go_to_left', 'left', 'right',
+                          'is_leaf', 'is_categorical'}
+                nodes = getattr(predictors[0][0], 'nodes', None) if predictors else None
+                if nodes is None or not fields <= set(nodes.dtype.names or ()):
+                    raise ValueError('Attributions for HistGradientBoostingClassifier need the tree predictors of '
+                                     'scikit-learn 1.5, which this scikit-learn version does not provide')
+                self.trees = [iteration[0] for iteration in predictors]
+                if any(predictor.nodes['is_categorical'].any() for predictor in self.trees):
+                    raise ValueError('Attributions are not supported for categorical splits')
+                # only the leaves are shrunk by the learning rate, so the inner nodes are scaled to match
+                self.node_values = [np.where(predictor.nodes['is_leaf'].astype(bool), 1.0, model.learning_rate)
+                                    * predictor.nodes['value'] for predictor in self.trees]
+
+            # the raw prediction of any wafer minus its attributions, i.e. prior plus root values
+            reference = self.background.reshape(1, -1)
+            self.expected_value = float(model.decision_function(reference)[0] - self.attributions(reference).sum())
+
+        elif self.model_class == 'LogisticRegression':
+            self.coef = model.coef_[0]
+            self.expected_value = float(model.intercept_[0] + self.coef @ self.background)
+
+        else:
+            self.expected_value = None
+
+        self.build_time = time.perf_counter() - start
+        self.logger.log(f'Explainer for {self.model_class} built in {self.build_time:.3f}s')
+
+    @staticmethod
+    def supported(model):
+        """
+        Tells whether attributions can be computed for a model.
+
+        Args:
+        model: object
+            The trained model.
+
+        Returns:
+        bool
+            True if the model is supported.
+        """
+        return type(model).__name__ in ('XGBClassifier', 'RandomForestClassifier', 'GradientBoostingClassifier',
+                                        'HistGradientBoostingClassifier', 'AdaBoostClassifier', 'LogisticRegression')
+
+    @staticmethod
+    def _class_one_fraction(tree):
+        """
+        Fraction of the faulty class in every node of a classification tree.
+        """
+        value = tree.value[:, 0, :]
+        return value[:, 1] / value.sum(axis=1)
+
+    def _adaboost_node_values(self, tree, weight):
+        """
+        Contribution of every node of an AdaBoost tree to the decision function of the ensemble.
+
+        Leaves hold the contribution of the tree, as in AdaBoostClassifier.decision_function. With
+        SAMME, an inner node holds the average of the leaves below it, weighted by their samples.
+        """
+        total_weight = self.model.estimator_weights_.sum()
+
+        # SAMME.R, deprecated by scikit-learn but its default before 1.6, sums the log-ratios of the leaf probabilities
+        if getattr(self.model, 'algorithm', 'SAMME') == 'SAMME.R':
+            value = np.clip(tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True), np.finfo(float).eps, None)
+            return (np.log(value[:, 1]) - np.log(value[:, 0])) / total_weight
+
+        # a vote for the faulty class adds 2 * weight, any other vote subtracts it
+        values = np.where(tree.value[:, 0, 1] > tree.value[:, 0, 0], 2.0, -2.0) * weight / total_weight
+
+        # children always come after their parent, so a reverse pass fills the inner nodes bottom-up
+        samples = tree.weighted_n_node_samples
+        for node in range(tree.node_count - 1, -1, -1):
+            left, right = tree.children_left[node], tree.children_right[node]
+            if left >= 0:
+                values[node] = (samples[left] * values[left] + samples[right] * values[right]) / (samples[left] + samples[right])
+        return values
+
+    def _node_deltas(self, tree, node_values):
+        """
+        Sparse (nodes x sensors) matrix holding, for every non-root node, the change of the
+        node value credited to the sensor its parent splits on.
+        """
+        from scipy import sparse
+
+        n_nodes = tree.node_count
+        parent = np.full(n_nodes, -1)
+        internal = np.where(tree.children_left >= 0)[0]
+        parent[tree.children_left[internal]] = internal
+        parent[tree.children_right[internal]] = internal
+
+        nodes = np.where(parent >= 0)[0]
+        deltas = node_values[nodes] - node_values[parent[nodes]]
+        sensors = tree.feature[parent[nodes]]
+        return sparse.csr_matrix((deltas, (nodes, sensors)), shape=(n_nodes, len(self.features)))
+
+    def _hist_path_attributions(self, nodes, node_values, X, attributions):
+        """
+        Adds the path attributions of one histogram gradient boosting tree, moving the wafers down one level at a time.
+
+        Follows the routing of the tree predictor: missing values go to the side learnt for them.
+        """
+        is_leaf = nodes['is_leaf'].astype(bool)
+        rows = np.arange(len(X)) if not is_leaf[0] else np.empty(0, dtype=np.intp)
+        node = np.zeros(len(rows), dtype=np.intp)
+        while len(rows):
+            feature = nodes['feature_idx'][node]
+            values = X[rows, feature]
+            go_left = np.where(np.isnan(values), nodes['missing_go_to_left'][node].astype(bool),
+                               values <= nodes['num_threshold'][node])
+            child = np.where(go_left, nodes['left'][node], nodes['right'][node])
+            # every wafer moves once per level, so the indices never repeat
+            attributions[rows, feature] += node_values[child] - node_values[node]
+            inner = ~is_leaf[child]
+            rows, node = rows[inner], child[inner]
+
+    def attributions(self, X):
+        """
+        Computes the attribution of every sensor for every wafer.
+
+        Args:
+        X: np.ndarray
+            Preprocessed features.
+
+        Returns:
+        np.ndarray
+            Array of shape (wafers, sensors) with the attributions.
+        """
+        start = time.perf_counter()
+        # sklearn trees split on float32, histogram gradient boosting and linear models on float64
+        X = np.asarray(X, dtype=float if self.model_class in ('LogisticRegression', 'HistGradientBoostingClassifier')
+                       else np.float32)
+
+        if self.model_class == 'XGBClassifier':
+            import xgboost
+
+            booster = self.model.get_booster()
+            contributions = booster.predict(xgboost.DMatrix(X, feature_names=booster.feature_names), pred_contribs=True)
+            self.expected_value = float(contributions[0, -1]) if len(contributions) else None
+            attributions = contributions[:, :-1]
+
+        elif self.model_class == 'RandomForestClassifier':
+            indicator, _ = self.model.decision_path(X)
+            attributions = np.asarray((indicator @ self.node_deltas).todense())
+
+        elif self.model_class in ('GradientBoostingClassifier', 'AdaBoostClassifier'):
+            attributions = np.zeros((len(X), len(self.features)))
+            for tree, node_deltas in zip(self.trees, self.node_deltas):
+                attributions += np.asarray((tree.decision_path(X) @ node_deltas).todense())
+
+        elif self.model_class == 'HistGradientBoostingClassifier':
+            attributions = np.zeros((len(X), len(self.features)))
+            for predictor, node_values in zip(self.trees, self.node_values):
+                self._hist_path_attributions(predictor.nodes, node_values, X, attributions)
+
+        else:
+            attributions = (X - self.background) * self.coef
+
+        self.logger.log(f'Computed attributions of {len(X)} wafers in {time.perf_counter() - start:.3f}s')
+        return attributions
+
+    def top_sensors(self, X, top_k=None):
+        """
+        Returns the sensors with the largest absolute attributions for every wafer.
+
+        Args:
+        X: np.ndarray
+            Preprocessed features.
+        top_k: int, optional (default=None)
+            Number of sensors per wafer. The configured number is used if None.
+
+        Returns:
+        pd.DataFrame
+            One row per wafer with 'Sensor i' and 'Attribution i' columns, largest first.
+        """
+        top_k = min(top_k or self.explainer_config.top_k, len(self.features))
+        attributions = self.attributions(X)
+        magnitude = np.abs(attributions)
+
+        # select the top k without sorting every sensor, then order only those
+        top = np.argpartition(-magnitude, top_k - 1, axis=1)[:, :top_k]
+        order = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        sensors = np.asarray(self.features)[top]
+        values = np.take_along_axis(attributions, top, axis=1)
+
+        columns = {}
+        for i in range(top_k):
+            columns[f'Sensor {i + 1}'] = sensors[:, i]
+            columns[f'Attribution {i + 1}'] = values[:, i]
+        return pd.DataFrame(columns)
@@ -0,0 +1,369 @@
+from src.logger import Logger
+from src.utils import save_obj, load_obj
+from src.run_config import RunConfig
+from dataclasses import dataclass
+import os, sys
+import copy
+import numpy as np
+import pandas as pd
+
+@dataclass
+class ModelRefresherConfig:
+    """
+    Configuration for incremental model refresh
+
+    Attributes:
+        preprocessor_file_path: str
+            Path to the preprocessor pickle file.
+        used_features: str
+            Path to the features used file.
+        trained_model_file_path: str
+            Path to the trained model.
+        holdout_data_path: str
+            Path to the rolling holdout csv file.
+        imputer_data_path: str
+            Path to the csv file with the rows the KNN imputer keeps as neighbours.
+        initial_imputer_data_path: str
+            Path to the train data csv file used as neighbours before the first refresh.
+        initial_holdout_data_path: str
+            Path to the test data csv file used as holdout before the first refresh.
+        holdout_fraction: float
+            Fraction of each new batch, its most recent rows, that goes to the holdout instead of training.
+        holdout_max_rows: int
+            Number of most recent rows kept in the rolling holdout.
+        imputer_max_rows: int
+            Number of most recent rows the KNN imputer keeps as neighbours.
+        extra_estimators: int
+            Number of boosting rounds or trees added to the model on each refresh.
+        max_estimators: int
+            Largest number of trees or boosting rounds of a refreshed model. Random forest drops its
+            oldest trees beyond it. Boosting models are not refreshed past it, since every round
+            builds on the earlier ones.
+        auc_tolerance: float
+            Largest drop of the holdout AUC-ROC score that still allows promotion.
+
+    """
+    preprocessor_file_path = os.path.join('../artifacts', 'preprocessor.pkl')
+    used_features = os.path.join('../artifacts', 'features.pkl')
+    trained_model_file_path = os.path.join('../artifacts', 'model.pkl')
+    holdout_data_path = os.path.join('../artifacts', 'holdout.csv')
+    imputer_data_path = os.path.join('../artifacts', 'imputer_neighbours.csv')
+    initial_imputer_data_path = os.path.join('../data', 'processed_data', 'train.csv')
+    initial_holdout_data_path = os.path.join('../data', 'processed_data', 'test.csv')
+    holdout_fraction = 0.2
+    holdout_max_rows = 5000
+    imputer_max_rows = 20000
+    extra_estimators = 50
+    max_estimators = 300
+    auc_tolerance = 0.0
+
+class ModelRefresher:
+    """
+    A class to update the preprocessor and the trained model with new labelled data without a full retrain.
+
+    Methods:
+    --------
+    __init__(run_config=None):
+        Initializes ModelRefresher with configuration, run configuration and logger.
+
+    update_imputer_window(X_new):
+        Appends rows to the neighbours of the KNN imputer, keeping only the most recent ones.
+
+    update_preprocessor(preprocessor, X_new):
+        Adds the new rows to the neighbours of the KNN imputer, or to the sketches of the streaming imputer.
+
+    update_model(model, X_new, Y_new):
+        Continues boosting or adds trees to the model using the new data only, within max_estimators.
+
+    update_holdout(new_holdout):
+        Appends rows to the rolling holdout, keeping only the most recent ones.
+
+    score(preprocessor, model, holdout):
+        Computes the AUC-ROC score of a model on the holdout.
+
+    initiate_model_refresh(new_data_path):
+        Refreshes the model with a new data file and promotes it if the holdout score does not regress.
+
+    """
+
+    def __init__(self, run_config=None):
+        """
+        Initializes ModelRefresher with configuration, run configuration and logger.
+
+        Args:
+        run_config: RunConfig, optional (default=None)
+            Run-level configuration with the seed and thread counts. A default RunConfig is used if None.
+        """
+        self.model_refresher_config = ModelRefresherConfig()
+        self.run_config = run_config if run_config is not None else RunConfig()
+        self.logger = Logger()
+
+    def update_imputer_window(self, X_new):
+        """
+        Appends rows to the neighbours of the KNN imputer, keeping only the most recent ones.
+
+        Args:
+        X_new: pd.DataFrame
+            The new features data.
+
+        Returns:
+        pd.DataFrame
+            The updated neighbours.
+        """
+        try:
+            config = self.model_refresher_config
+            if os.path.exists(config.imputer_data_path):
+                window = pd.read_csv(config.imputer_data_path)[list(X_new.columns)]
+            elif os.path.exists(config.initial_imputer_data_path):
+                self.logger.log(f'No imputer neighbours yet, starting from {config.initial_imputer_data_path}')
+                window = pd.read_csv(config.initial_imputer_data_path)[list(X_new.columns)]
+            else:
+                window = X_new.iloc[:0]
+
+            return pd.concat([window, X_new], ignore_index=True).tail(config.imputer_max_rows)
+
+        except Exception as e:
+            self.logger.log('Error occurred while updating the imputer neighbours', 'ERROR')
+            raise e
+
+    def update_preprocessor(self, preprocessor, X_new):
+        """
+        Adds the new rows to the neighbours of the KNN imputer, keeping only the most recent ones.
+
+        Fitting a KNN imputer only stores its neighbours, so this costs as much as the window.
+        A streaming median imputer adds the new rows to its quantile sketches instead.
+        The scaler is kept as it is, because the splits of the existing trees depend on its scale.
+
+        Args:
+        preprocessor: Pipeline
+            The fitted preprocessing pipeline with imputer and scaler.
+        X_new: pd.DataFrame
+            The new features data.
+
+        Returns:
+        tuple
+            A copy of the preprocessing pipeline with the updated imputer, and the neighbours
+            the KNN imputer was fitted on, or None for the streaming imputer.
+        """
+        try:
+            self.logger.log('Updating the imputer with the new data...')
+            preprocessor = copy.deepcopy(preprocessor)
+            imputer = preprocessor.named_steps['imputer']
+
+            if hasattr(imputer, 'partial_fit'):
+                # streaming median imputer: add the new rows to its sketches
+                imputer.partial_fit(X_new)
+                self.logger.log('Imputer medians updated.')
+                return preprocessor, None
+
+            window = self.update_imputer_window(X_new)
+            imputer.fit(window)
+
+            self.logger.log(f'Imputer updated, it keeps {len(window)} rows.')
+            return preprocessor, window
+
+        except Exception as e:
+            self.logger.log('Error occurred while updating the preprocessor', 'ERROR')
+            raise e
+
+    def update_model(self, model, X_new, Y_new):
+        """
+        Continues boosting or adds trees to the model using the new data only, within max_estimators.
+
+        XGBoost continues from the current booster. Random forest, gradient boosting and
+        histogram gradient boosting are warm started with extra estimators. Random forest then
+        drops its oldest trees beyond max_estimators, so it follows the most recent data.
+        Boosting models that would exceed max_estimators are not updated.
+
+        Args:
+        model: object
+            The trained model.
+        X_new: pd.DataFrame
+            The new preprocessed features data.
+        Y_new: pd.Series
+            The new target, encoded as 0/1.
+
+        Returns:
+        object
+            The updated copy of the model, or None if the model cannot be updated incrementally.
+        """
+        try:
+            extra_estimators = self.model_refresher_config.extra_estimators
+            max_estimators = self.model_refresher_config.max_estimators
+            model_class = type(model).__name__
+
+            # boosting rounds build on each other, so none can be dropped to make room
+            rounds = {
+                'XGBClassifier': lambda: model.get_booster().num_boosted_rounds(),
+                'GradientBoostingClassifier': lambda: model.n_estimators_,
+                'HistGradientBoostingClassifier': lambda: model.n_iter_,
+            }
+            if model_class in rounds and rounds[model_class]() + extra_estimators > max_estimators:
+                self.logger.log(f'{model_class} would exceed {max_estimators} boosting rounds, '
+                                'run the training pipeline instead', 'WARNING')
+                return None
+
+            candidate = copy.deepcopy(model)
+
+            if model_class == 'XGBClassifier':
+                self.logger.log(f'Continuing boosting of XGBoost for {extra_estimators} rounds...')
+                candidate.set_params(n_estimators=extra_estimators)
+                candidate.fit(X_new, Y_new, xgb_model=model.get_booster())
+
+            elif model_class == 'RandomForestClassifier':
+                self.logger.log(f'Warm starting {model_class} with {extra_estimators} extra estimators...')
+                candidate.set_params(warm_start=True, n_estimators=len(model.estimators_) + extra_estimators)
+                candidate.fit(X_new, Y_new)
+
+                # the forest averages its trees, so the oldest ones can be dropped
+                candidate.estimators_ = candidate.estimators_[-max_estimators:]
+                candidate.set_params(warm_start=False, n_estimators=len(candidate.estimators_))
+
+            elif model_class == 'GradientBoostingClassifier':
+                self.logger.log(f'Warm starting {model_class} with {extra_estimators} extra estimators...')
+                candidate.set_params(warm_start=True, n_estimators=model.n_estimators_ + extra_estimators)
+                candidate.fit(X_new, Y_new)
+                candidate.set_params(warm_start=False)
+
+            elif model_class == 'HistGradientBoostingClassifier':
+                self.logger.log(f'Warm starting {model_class} with {extra_estimators} extra iterations...')
+                candidate.set_params(warm_start=True, max_iter=model.n_iter_ + extra_estimators)
+                candidate.fit(X_new, Y_new)
+                candidate.set_params(warm_start=False)
+
+            else:
+                self.logger.log(f'{model_class} cannot be updated incrementally, run the training pipeline instead', 'WARNING')
+                return None
+
+            return candidate
+
+        except Exception as e:
+            self.logger.log('Error occurred while updating the model', 'ERROR')
+            raise e
+
+    def update_holdout(self, new_holdout):
+        """
+        Appends rows to the rolling holdout, keeping only the most recent ones.
+
+        Args:
+        new_holdout: pd.DataFrame
+            The new labelled rows for the holdout.
+
+        Returns:
+        pd.DataFrame
+            The updated holdout.
+        """
+        try:
+            config = self.model_refresher_config
+            if os.path.exists(config.holdout_data_path):
+                holdout = pd.read_csv(config.holdout_data_path)[list(new_holdout.columns)]
+            elif os.path.exists(config.initial_holdout_data_path):
+                self.logger.log(f'No rolling holdout yet, starting from {config.initial_holdout_data_path}')
+                holdout = pd.read_csv(config.initial_holdout_data_path)[list(new_holdout.columns)]
+            else:
+                holdout = new_holdout.iloc[:0]
+
+            holdout = pd.concat([holdout, new_holdout], ignore_index=True).tail(config.holdout_max_rows)
+            self.logger.log(f'Rolling holdout has {len(holdout)} rows.')
+            return holdout
+
+        except Exception as e:
+            self.logger.log('Error occurred while updating the holdout', 'ERROR')
+            raise e
+
+    def score(self, preprocessor, model, holdout):
+        """
+        Computes the AUC-ROC score of a model on the holdout.
+
+        Args:
+        preprocessor: Pipeline
+            The preprocessing pipeline used with the model.
+        model: object
+            The trained model.
+        holdout: pd.DataFrame
+            The holdout with the used features and the 'Good/Bad' target.
+
+        Returns:
+        float
+            The AUC-ROC score, or None if the holdout has only one class.
+        """
+        from sklearn.metrics import roc_auc_score
+
+        features = preprocessor.feature_names_in_
+        Y_holdout = holdout['Good/Bad'].replace({-1:0, 1:1})
+        if Y_holdout.nunique() < 2:
+            return None
+
+        X_holdout = pd.DataFrame(preprocessor.transform(holdout[features]), columns=features)
+        return roc_auc_score(Y_holdout, model.predict_proba(X_holdout)[:, 1])
+
+    def initiate_model_refresh(self, new_data_path):
+        """
+        Refreshes the model with a new data file and promotes it if the holdout score does not regress.
+
+        The most recent rows of the new data go to the rolling holdout, the others update the
+        preprocessor and the model. Nothing is saved unless the refreshed model is promoted.
+
+        Args:
+        new_data_path: str
+            Path to the csv file with the new labelled wafers.
+
+        Returns:
+        bool
+            True if the refreshed model was promoted.
+
+        Raises:
+        Exception
+            If any error occurs during the refresh.
+        """
+        try:
+            self.logger.log('Initiating model refresh...')
+            config = self.model_refresher_config
+            self.run_config.seed_everything()
+
+            preprocessor = load_obj(config.preprocessor_file_path)
+            model = load_obj(config.trained_model_file_path)
+            features = list(load_obj(config.used_features))
+
+            # split the new data into rows for training and rows for the holdout
+            new_data = pd.read_csv(new_data_path)[features + ['Good/Bad']]
+            n_holdout = int(round(len(new_data) * config.holdout_fraction))
+            new_train, new_holdout = new_data.iloc[:len(new_data) - n_holdout], new_data.iloc[len(new_data) - n_holdout:]
+            self.logger.log(f'{len(new_train)} new rows for training, {len(new_holdout)} for the holdout.')
+
+            # update the preprocessor and the model with the new training rows
+            X_new, Y_new = new_train[features], new_train['Good/Bad'].replace({-1:0, 1:1})
+            if Y_new.nunique() < 2:
+                self.logger.log('New training rows have only one class, skipping the refresh', 'WARNING')
+                return False
+
+            candidate_preprocessor, imputer_window = self.update_preprocessor(preprocessor, X_new)
+            X_new_trans = pd.DataFrame(candidate_preprocessor.transform(X_new), columns=features)
+            candidate = self.update_model(model, X_new_trans, Y_new)
+            if candidate is None:
+                return False
+
+            # compare the current and the refreshed model on the rolling holdout
+            holdout = self.update_holdout(new_holdout)
+            current_score = self.score(preprocessor, model, holdout)
+            candidate_score = self.score(candidate_preprocessor, candidate, holdout)
+            self.logger.log(f'Holdout AUC-ROC score, current: {current_score}, refreshed: {candidate_score}')
+            print(f'Holdout AUC-ROC score, current: {current_score}, refreshed: {candidate_score}')
+
+            os.makedirs(os.path.dirname(config.holdout_data_path), exist_ok=True)
+            holdout.to_csv(config.holdout_data_path, index=False, header=True)
+
+            if current_score is None or candidate_score < current_score - config.auc_tolerance:
+                self.logger.log('Refreshed model not promoted.', 'WARNING')
+                return False
+
+            self.logger.log('Promoting the refreshed model...')
+            save_obj(config.preprocessor_file_path, candidate_preprocessor)
+            save_obj(config.trained_model_file_path, candidate)
+            if imputer_window is not None:
+                imputer_window.to_csv(config.imputer_data_path, index=False, header=True)
+            return True
+
+        except Exception as e:
+            self.logger.log('Error occurred during model refresh', 'ERROR')
+            raise e
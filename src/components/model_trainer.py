@@ -1,13 +1,47 @@
 from src.logger import Logger
 from src.utils import save_obj
-from src.utils import evaluate_model
+from src.run_config import RunConfig
+from src.components.training_scheduler import TrainingScheduler
+from src.components.model_evaluator import ModelEvaluator
 import os, sys
-from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier, GradientBoostingClassifier
-from xgboost import XGBClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
+import importlib
 from dataclasses import dataclass
 
+# candidate models as (module, class name), imported only when the model is built
+MODEL_CLASSES = {
+    'SVC': ('sklearn.svm', 'SVC'),
+    'Logistic regression': ('sklearn.linear_model', 'LogisticRegression'),
+    'Random Forest': ('sklearn.ensemble', 'RandomForestClassifier'),
+    'XGBoost': ('xgboost', 'XGBClassifier'),
+    'AdaBoost': ('sklearn.ensemble', 'AdaBoostClassifier'),
+    'GradientBoost': ('sklearn.ensemble', 'GradientBoostingClassifier'),
+}
+
+# candidate models replaced by a faster variant on large training data
+LARGE_DATA_MODEL_CLASSES = {
+    'GradientBoost': ('sklearn.ensemble', 'HistGradientBoostingClassifier'),
+}
+
+def import_model_class(name, large_data=False):
+    """
+    Imports the class of a candidate model.
+
+    Args:
+    name: str
+        Name of the model as listed in MODEL_CLASSES.
+    large_data: bool, optional (default=False)
+        Whether to import the variant listed in LARGE_DATA_MODEL_CLASSES, if there is one.
+
+    Returns:
+    type
+        The model class.
+    """
+    if large_data and name in LARGE_DATA_MODEL_CLASSES:
+        module_name, class_name = LARGE_DATA_MODEL_CLASSES[name]
+    else:
+        module_name, class_name = MODEL_CLASSES[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
 @dataclass
 class ModelTrainerConfg:
 
@@ -17,9 +51,12 @@ class ModelTrainerConfg:
     Attributes:
         trained_model_file_path: str
             Path to the trained model.
+        large_data_min_samples: int
+            Number of training samples from which the large data variants of the models are used.
      
     """
     trained_model_file_path = os.path.join('../artifacts', 'model.pkl')
+    large_data_min_samples = 10000
 
 class ModelTrainer:
     """
@@ -27,21 +64,75 @@ class ModelTrainer:
 
     Methods:
     --------
-    __init__: 
-        Initializes ModelTrainer with configuration and logger.
+    __init__(run_config=None): 
+        Initializes ModelTrainer with configuration, run configuration and logger.
+
+    get_models(names=None, n_samples=0):
+        Creates the candidate models, seeded and threaded according to the run configuration.
 
     initiate_model_training(X_train, Y_train, X_test, Y_test): 
-        Trains multiple models and evaluates them using AUC-ROC score and saves the best model. 
+        Trains multiple models and evaluates them using AUC-ROC score and saves the best model
+        together with an evaluation report of all the models.
     """
 
-    def __init__(self):
+    def __init__(self, run_config=None):
         """
         Initializes ModelTrainer with configuration and logger.
+
+        Args:
+        run_config: RunConfig, optional (default=None)
+            Run-level configuration with seeds, thread counts and cpu budget. A default RunConfig is used if None.
         """
 
         self.model_trainer_config = ModelTrainerConfg()
+        self.run_config = run_config if run_config is not None else RunConfig()
         self.logger = Logger()
 
+        # cpu usage of every model in the last training run
+        self.model_usage = {}
+
+    def get_models(self, names=None, n_samples=0):
+        """
+        Creates the candidate models, seeded and threaded according to the run configuration.
+
+        Each model gets its own seed derived from the master seed, so the models are
+        reproducible whether they are trained one after another or in parallel.
+
+        Args:
+        names: list, optional (default=None)
+            Names of the models to create. All candidate models are created if None.
+            Only the classes of the requested models are imported.
+        n_samples: int, optional (default=0)
+            Number of training samples. From large_data_min_samples on, gradient boosting
+            is replaced by its histogram-based variant.
+
+        Returns:
+        dict
+            A dictionary with model names as keys and model instances as values.
+        """
+        # seeds are derived from the full candidate list, so a subset gets the same seeds
+        seeds = self.run_config.worker_seeds(list(MODEL_CLASSES))
+        n_jobs = self.run_config.n_jobs
+
+        model_params = {
+            'SVC': {'probability': True, 'random_state': seeds['SVC']},
+            'Logistic regression': {'random_state': seeds['Logistic regression']},
+            'Random Forest': {'random_state': seeds['Random Forest'], 'n_jobs': n_jobs},
+            'XGBoost': {'use_label_encoder': False, 'random_state': seeds['XGBoost'], 'n_jobs': n_jobs},
+            'AdaBoost': {'random_state': seeds['AdaBoost']},
+            'GradientBoost': {'random_state': seeds['GradientBoost']},
+        }
+
+        if names is None:
+            names = list(MODEL_CLASSES)
+
+        large_data = n_samples >= self.model_trainer_config.large_data_min_samples
+        if large_data:
+            self.logger.log(f'{n_samples} training samples, using the large data model variants')
+
+        models = {name: import_model_class(name, large_data)(**model_params[name]) for name in names}
+        return models
+
     def initiate_model_training(self, X_train, Y_train, X_test, Y_test):
         """
         Trains multiple models and evaluates them using AUC-ROC score and saves the best model. 
@@ -63,23 +154,27 @@ class ModelTrainer:
         try:
             self.logger.log('Initiating model training...')
 
-            models = {
-                'SVC': SVC(probability=True),
-                'Logistic regression': LogisticRegression(),
-                'Random Forest': RandomForestClassifier(),
-                'XGBoost': XGBClassifier(use_label_encoder=False),
-                'AdaBoost': AdaBoostClassifier(),
-                'GradientBoost': GradientBoostingClassifier(),
-                
-            }
+            self.run_config.seed_everything()
+            models = self.get_models(n_samples=len(X_train))
 
-            model_score_dict = evaluate_model(X_train, Y_train, X_test, Y_test, models)
+            scheduler = TrainingScheduler(self.run_config)
+            model_score_dict, self.model_usage = scheduler.run(models, X_train, Y_train, X_test, Y_test)
 
             print('Model name: Score')
             for key, value in model_score_dict.items():
                 print(key, ':', value)
             print('\n')   
 
+            print('Model name: threads, wall time, cpu time, cpu utilization')
+            for key, usage in self.model_usage.items():
+                print(key, ':', usage['threads'], f"{usage['wall_time']:.2f}s", f"{usage['cpu_time']:.2f}s",
+                      f"{usage['cpu_utilization']:.0%}")
+            print('\n')
+
+            # full metrics and inference throughput of every model, saved as a report
+            model_evaluator = ModelEvaluator(self.run_config)
+            model_evaluator.initiate_model_evaluation(models, X_test, Y_test)
+
             # Find the best model based on AUC-ROC score
             best_model_score = max(sorted(model_score_dict.values())) 
             best_model_name = best_model_name = list(model_score_dict.keys())[list(model_score_dict.values()).index(best_model_score)]
@@ -0,0 +1,290 @@
+from src.logger import Logger
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+import os, sys
+import sqlite3
+import pandas as pd
+
+@dataclass
+class PredictionStoreConfig:
+    """
+    Configuration for the prediction store
+
+    Attributes:
+        store_path: str
+            Path to the SQLite database file.
+        timestamp_format: str
+            Format of the stored timestamps. It sorts the same as the times it represents.
+        retention_days: int
+            Number of days predictions are kept by apply_retention.
+
+    """
+    store_path = os.path.join('predictions', 'predictions.db')
+    timestamp_format = '%Y-%m-%d %H:%M:%S'
+    retention_days = 365
+
+class PredictionStore:
+    """
+    An append-only SQLite store of predictions with indexed lookups by wafer, lot and time range.
+
+    Methods:
+    --------
+    __init__(store_path=None):
+        Initializes PredictionStore with configuration and logger and creates the table and indexes.
+
+    write(wafer_ids, labels, probabilities, model_version, lots=None, predicted_at=None):
+        Appends a batch of predictions in a single transaction.
+
+    by_wafer(wafer_id, start=None, end=None):
+        Returns the predictions of a wafer.
+
+    by_lot(lot, start=None, end=None):
+        Returns the predictions of a lot.
+
+    in_range(start=None, end=None):
+        Returns the predictions made in a time range.
+
+    compact():
+        Keeps only the latest prediction per wafer and model version and reclaims the free space.
+
+    apply_retention(retention_days=None):
+        Deletes the predictions older than the retention period.
+
+    """
+
+    def __init__(self, store_path=None):
+        """
+        Initializes PredictionStore with configuration and logger and creates the table and indexes.
+
+        Args:
+        store_path: str, optional (default=None)
+            Path to the SQLite database file. The configured path is used if None.
+        """
+        self.prediction_store_config = PredictionStoreConfig()
+        self.store_path = store_path if store_path is not None else self.prediction_store_config.store_path
+        self.logger = Logger()
+
+        os.makedirs(os.path.dirname(self.store_path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            # write-ahead logging lets lookups run while a batch is being written
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS predictions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    wafer_id TEXT NOT NULL,
+                    lot TEXT,
+                    predicted_at TEXT NOT NULL,
+                    model_version TEXT NOT NULL,
+                    probability REAL,
+                    label INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_predictions_wafer ON predictions (wafer_id, predicted_at);
+                CREATE INDEX IF NOT EXISTS idx_predictions_lot ON predictions (lot, predicted_at);
+                CREATE INDEX IF NOT EXISTS idx_predictions_time ON predictions (predicted_at);
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        """
+        Opens a connection that commits on success and is always closed.
+
+        A connection per call keeps the store usable from background worker threads.
+        """
+        connection = sqlite3.connect(self.store_path)
+        try:
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _format_time(self, value):
+        """
+        Formats a datetime as stored; strings are assumed to be formatted already.
+        """
+        if value is None or isinstance(value, str):
+            return value
+        return value.strftime(self.prediction_store_config.timestamp_format)
+
+    def write(self, wafer_ids, labels, probabilities, model_version, lots=None, predicted_at=None):
+        """
+        Appends a batch of predictions in a single transaction.
+
+        Args:
+        wafer_ids: list
+            Wafer IDs of the predictions.
+        labels: list
+            Predicted labels.
+        probabilities: list
+            Predicted probabilities of the faulty class, or None if the model has none.
+        model_version: str
+            Version of the model that made the predictions.
+        lots: list, optional (default=None)
+            Lots of the wafers, if known.
+        predicted_at: datetime, optional (default=None)
+            Time of the predictions. The current time is used if None.
+
+        Returns:
+        int
+            Number of predictions written.
+
+        Raises:
+        Exception
+            If any error occurs while writing the predictions.
+        """
+        try:
+            predicted_at = self._format_time(predicted_at or datetime.now())
+            n_rows = len(wafer_ids)
+            lots = lots if lots is not None else [None] * n_rows
+            probabilities = probabilities if probabilities is not None else [None] * n_rows
+
+            rows = [
+                (str(wafer_id), None if lot is None else str(lot), predicted_at, model_version,
+                 None if probability is None else float(probability), int(label))
+                for wafer_id, lot, probability, label in zip(wafer_ids, lots, probabilities, labels)
+            ]
+
+            with self._connect() as connection:
+                connection.executemany(
+                    'INSERT INTO predictions (wafer_id, lot, predicted_at, model_version, probability, label) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+            self.logger.log(f'Stored {n_rows} predictions of model {model_version}')
+            return n_rows
+
+        except Exception as e:
+            self.logger.log('Error occurred while storing the predictions', 'ERROR')
+            raise e
+
+    def _query(self, column=None, value=None, start=None, end=None):
+        """
+        Returns the predictions matching an optional column value and time range, oldest first.
+        """
+        conditions, params = [], []
+        if column is not None:
+            conditions.append(f'{column} = ?')
+            params.append(str(value))
+        if start is not None:
+            conditions.append('predicted_at >= ?')
+            params.append(self._format_time(start))
+        if end is not None:
+            conditions.append('predicted_at < ?')
+            params.append(self._format_time(end))
+
+        sql = 'SELECT wafer_id, lot, predicted_at, model_version, probability, label FROM predictions'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY predicted_at, id'
+
+        with self._connect() as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def by_wafer(self, wafer_id, start=None, end=None):
+        """
+        Returns the predictions of a wafer.
+
+        Args:
+        wafer_id: str
+            The wafer ID.
+        start: datetime, optional (default=None)
+            Earliest prediction time, inclusive.
+        end: datetime, optional (default=None)
+            Latest prediction time, exclusive.
+
+        Returns:
+        pd.DataFrame
+            The predictions, oldest first.
+        """
+        return self._query('wafer_id', wafer_id, start, end)
+
+    def by_lot(self, lot, start=None, end=None):
+        """
+        Returns the predictions of a lot.
+
+        Args:
+        lot: str
+            The lot.
+        start: datetime, optional (default=None)
+            Earliest prediction time, inclusive.
+        end: datetime, optional (default=None)
+            Latest prediction time, exclusive.
+
+        Returns:
+        pd.DataFrame
+            The predictions, oldest first.
+        """
+        return self._query('lot', lot, start, end)
+
+    def in_range(self, start=None, end=None):
+        """
+        Returns the predictions made in a time range.
+
+        Args:
+        start: datetime, optional (default=None)
+            Earliest prediction time, inclusive.
+        end: datetime, optional (default=None)
+            Latest prediction time, exclusive.
+
+        Returns:
+        pd.DataFrame
+            The predictions, oldest first.
+        """
+        return self._query(start=start, end=end)
+
+    def compact(self):
+        """
+        Keeps only the latest prediction per wafer and model version and reclaims the free space.
+
+        Returns:
+        int
+            Number of predictions deleted.
+        """
+        try:
+            with self._connect() as connection:
+                deleted = connection.execute('''
+                    DELETE FROM predictions WHERE id NOT IN (
+                        SELECT MAX(id) FROM predictions GROUP BY wafer_id, model_version
+                    )
+                ''').rowcount
+
+            # VACUUM cannot run inside a transaction
+            connection = sqlite3.connect(self.store_path)
+            try:
+                connection.execute('VACUUM')
+            finally:
+                connection.close()
+
+            self.logger.log(f'Compacted the prediction store, {deleted} predictions deleted')
+            return deleted
+
+        except Exception as e:
+            self.logger.log('Error occurred while compacting the prediction store', 'ERROR')
+            raise e
+
+    def apply_retention(self, retention_days=None):
+        """
+        Deletes the predictions older than the retention period.
+
+        Args:
+        retention_days: int, optional (default=None)
+            Number of days predictions are kept. The configured retention is used if None.
+
+        Returns:
+        int
+            Number of predictions deleted.
+        """
+        try:
+            if retention_days is None:
+                retention_days = self.prediction_store_config.retention_days
+            cutoff = self._format_time(datetime.now() - timedelta(days=retention_days))
+
+            with self._connect() as connection:
+                deleted = connection.execute('DELETE FROM predictions WHERE predicted_at < ?', (cutoff,)).rowcount
+
+            self.logger.log(f'Deleted {deleted} predictions older than {retention_days} days')
+            return deleted
+
+        except Exception as e:
+            self.logger.log('Error occurred while applying the retention policy', 'ERROR')
+            raise e
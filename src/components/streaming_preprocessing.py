@@ -0,0 +1,394 @@
+from sklearn.base import BaseEstimator, TransformerMixin, OneToOneFeatureMixin
+import numpy as np
+
+def _set_feature_attributes(estimator, X):
+    """
+    Records the number of features and, for data frames with string column names, their names,
+    as scikit-learn estimators do when they are fitted.
+
+    Args:
+    estimator: BaseEstimator
+        The estimator being fitted.
+    X: pd.DataFrame or np.ndarray
+        Features data.
+    """
+    estimator.n_features_in_ = np.shape(X)[1]
+    columns = getattr(X, 'columns', None)
+    if columns is not None and all(isinstance(column, str) for column in columns):
+        estimator.feature_names_in_ = np.asarray(columns, dtype=object)
+
+class ColumnSketches:
+    """
+    Mergeable t-digest quantile sketches, one per column, with bounded memory.
+
+    Each column keeps at most about compression / 2 centroids (mean, weight), small near the
+    tails and large in the middle, plus its exact minimum and maximum. Missing values are
+    counted but not sketched. Sketches built on separate chunks or workers can be merged.
+
+    Methods:
+    --------
+    __init__(n_columns, compression=500, buffer_size=5000):
+        Initializes empty sketches.
+
+    update(X):
+        Adds a chunk of rows to the sketches.
+
+    merge(other):
+        Adds the centroids of other sketches of the same columns.
+
+    add_constant(values, counts):
+        Adds counts copies of a value to every column.
+
+    quantiles(q):
+        Returns the estimated q-quantile (0 <= q <= 1) of every column.
+
+    """
+
+    def __init__(self, n_columns, compression=500, buffer_size=5000):
+        """
+        Initializes empty sketches.
+
+        Args:
+        n_columns: int
+            Number of columns.
+        compression: int, optional (default=500)
+            Larger values keep more centroids and give more accurate quantiles.
+        buffer_size: int, optional (default=5000)
+            Number of rows buffered before the centroids are compressed.
+        """
+        self.n_columns = n_columns
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = [np.empty(0) for _ in range(n_columns)]
+        self.weights = [np.empty(0) for _ in range(n_columns)]
+        self.point_mass = [np.empty(0, dtype=bool) for _ in range(n_columns)]
+        self.buffer = []
+        self.buffered_rows = 0
+        self.minimum = np.full(n_columns, np.inf)
+        self.maximum = np.full(n_columns, -np.inf)
+        self.n_missing = np.zeros(n_columns, dtype=np.int64)
+
+    def update(self, X):
+        """
+        Adds a chunk of rows to the sketches.
+
+        Args:
+        X: np.ndarray
+            Array of shape (rows, columns); NaN marks a missing value.
+        """
+        X = np.asarray(X, dtype=float)
+        missing = np.isnan(X)
+        self.n_missing += missing.sum(axis=0)
+        if missing.all(axis=0).all():
+            return
+
+        with np.errstate(invalid='ignore'):
+            self.minimum = np.fmin(self.minimum, np.nanmin(np.where(missing, np.inf, X), axis=0))
+            self.maximum = np.fmax(self.maximum, np.nanmax(np.where(missing, -np.inf, X), axis=0))
+
+        self.buffer.append(X)
+        self.buffered_rows += len(X)
+        if self.buffered_rows >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        """
+        Compresses the buffered rows into the centroids of every column.
+        """
+        if not self.buffer:
+            return
+        X = np.vstack(self.buffer)
+        self.buffer, self.buffered_rows = [], 0
+
+        for column in range(self.n_columns):
+            values = X[:, column]
+            values = values[~np.isnan(values)]
+            self._compress(column, np.concatenate([self.means[column], values]),
+                           np.concatenate([self.weights[column], np.ones(len(values))]),
+                           np.concatenate([self.point_mass[column], np.ones(len(values), dtype=bool)]))
+
+    def _compress(self, column, means, weights, point_mass):
+        """
+        Merges sorted neighbouring centroids whose quantiles fall into the same unit of the k1 scale function.
+
+        Equal values are always merged first, and a centroid that already spans a whole unit, such as
+        a frequent value, is kept on its own, so point masses stay exact.
+        """
+        if len(means) == 0:
+            self.means[column], self.weights[column], self.point_mass[column] = means, weights, point_mass
+            return
+
+        order = np.argsort(means, kind='mergesort')
+        means, weights, point_mass = means[order], weights[order], point_mass[order]
+
+        # collapse equal values
+        starts = np.flatnonzero(np.r_[True, means[1:] != means[:-1]])
+        weights = np.add.reduceat(weights, starts)
+        point_mass = np.minimum.reduceat(point_mass, starts)
+        means = means[starts]
+
+        total = weights.sum()
+        right = np.cumsum(weights) / total
+        left = right - weights / total
+        k_left, k_centre, k_right = (self.compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+                                     for q in (left, (left + right) / 2, right))
+        cluster = np.floor(k_centre - k_centre[0]).astype(np.int64)
+        full = (k_right - k_left) >= 1
+
+        boundary = np.r_[True, (cluster[1:] != cluster[:-1]) | full[1:] | full[:-1]]
+        starts = np.flatnonzero(boundary)
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+
+        # a centroid is a point mass if it holds a single distinct value
+        sizes = np.diff(np.r_[starts, len(means)])
+        self.means[column], self.weights[column] = merged_means, merged_weights
+        self.point_mass[column] = (sizes == 1) & point_mass[starts]
+
+    def merge(self, other):
+        """
+        Adds the centroids of other sketches of the same columns.
+
+        Args:
+        other: ColumnSketches
+            Sketches built on other rows.
+        """
+        self._flush()
+        other._flush()
+        for column in range(self.n_columns):
+            self._compress(column, np.concatenate([self.means[column], other.means[column]]),
+                           np.concatenate([self.weights[column], other.weights[column]]),
+                           np.concatenate([self.point_mass[column], other.point_mass[column]]))
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self.n_missing += other.n_missing
+
+    def add_constant(self, values, counts):
+        """
+        Adds counts copies of a value to every column, e.g. the imputed value of the missing ones.
+
+        Args:
+        values: np.ndarray
+            One value per column.
+        counts: np.ndarray
+            Number of copies per column.
+        """
+        self._flush()
+        for column in range(self.n_columns):
+            if counts[column] > 0 and not np.isnan(values[column]):
+                self._compress(column, np.r_[self.means[column], values[column]],
+                               np.r_[self.weights[column], counts[column]],
+                               np.r_[self.point_mass[column], True])
+                self.minimum[column] = min(self.minimum[column], values[column])
+                self.maximum[column] = max(self.maximum[column], values[column])
+
+    def quantiles(self, q):
+        """
+        Returns the estimated q-quantile (0 <= q <= 1) of every column.
+
+        Args:
+        q: float
+            The quantile.
+
+        Returns:
+        np.ndarray
+            One estimate per column, NaN for columns without any value.
+        """
+        self._flush()
+        result = np.full(self.n_columns, np.nan)
+        for column in range(self.n_columns):
+            means, weights = self.means[column], self.weights[column]
+            if len(means) == 0:
+                continue
+            total = weights.sum()
+            right = np.cumsum(weights)
+            left = right - weights
+            point_mass = self.point_mass[column]
+
+            # interpolate between centroid centres, anchored at the exact minimum and maximum;
+            # a point mass holds its value over all the ranks it covers. Ranks are placed like
+            # numpy's linear percentile, so exact values are reproduced while nothing is merged.
+            centres = np.where(point_mass[:, None], np.c_[left + 0.5, right - 0.5], ((left + right) / 2)[:, None])
+            centres = np.r_[0.5, centres.ravel(), total - 0.5]
+            points = np.r_[self.minimum[column], np.repeat(means, 2), self.maximum[column]]
+            result[column] = np.interp(q * (total - 1) + 0.5, centres, points)
+        return result
+
+class StreamingMedianImputer(OneToOneFeatureMixin, TransformerMixin, BaseEstimator):
+    """
+    Replaces missing values by column medians estimated with mergeable quantile sketches.
+
+    Can be fitted chunk by chunk with partial_fit and merged across workers with merge.
+    """
+
+    def __init__(self, compression=500):
+        self.compression = compression
+
+    def partial_fit(self, X, y=None):
+        """
+        Adds a chunk of rows to the median estimates.
+
+        Args:
+        X: pd.DataFrame or np.ndarray
+            A chunk of features data.
+
+        Returns:
+        StreamingMedianImputer
+            The imputer itself.
+        """
+        if not hasattr(self, 'sketches_'):
+            _set_feature_attributes(self, X)
+            self.sketches_ = ColumnSketches(self.n_features_in_, self.compression)
+        self.sketches_.update(X)
+        self._statistics = None
+        return self
+
+    def fit(self, X, y=None):
+        """
+        Fits the median estimates on X from scratch.
+        """
+        for attribute in ('sketches_', 'feature_names_in_'):
+            self.__dict__.pop(attribute, None)
+        return self.partial_fit(X)
+
+    @property
+    def statistics_(self):
+        """
+        Estimated median of every column, computed from the sketches when first needed.
+        """
+        if getattr(self, '_statistics', None) is None:
+            self._statistics = self.sketches_.quantiles(0.5)
+        return self._statistics
+
+    def merge(self, other):
+        """
+        Adds the sketches of an imputer fitted on other rows.
+
+        Args:
+        other: StreamingMedianImputer
+            An imputer fitted on the same columns.
+
+        Returns:
+        StreamingMedianImputer
+            The imputer itself.
+        """
+        self.sketches_.merge(other.sketches_)
+        self._statistics = None
+        return self
+
+    def transform(self, X):
+        """
+        Replaces missing values by the column medians.
+        """
+        X = np.array(X, dtype=float)
+        rows, columns = np.where(np.isnan(X))
+        X[rows, columns] = self.statistics_[columns]
+        return X
+
+class StreamingRobustScaler(OneToOneFeatureMixin, TransformerMixin, BaseEstimator):
+    """
+    Robust scaler whose median and interquartile range are estimated with mergeable quantile sketches.
+
+    Behaves like sklearn's RobustScaler but can be fitted chunk by chunk with partial_fit and
+    merged across workers with merge. Missing values are ignored while fitting.
+    """
+
+    def __init__(self, quantile_range=(25.0, 75.0), compression=500):
+        self.quantile_range = quantile_range
+        self.compression = compression
+
+    def partial_fit(self, X, y=None):
+        """
+        Adds a chunk of rows to the quantile estimates.
+
+        Args:
+        X: pd.DataFrame or np.ndarray
+            A chunk of features data.
+
+        Returns:
+        StreamingRobustScaler
+            The scaler itself.
+        """
+        if not hasattr(self, 'sketches_'):
+            _set_feature_attributes(self, X)
+            self.sketches_ = ColumnSketches(self.n_features_in_, self.compression)
+        self.sketches_.update(X)
+        self._statistics = None
+        return self
+
+    def fit(self, X, y=None):
+        """
+        Fits the quantile estimates on X from scratch.
+        """
+        for attribute in ('sketches_', 'feature_names_in_'):
+            self.__dict__.pop(attribute, None)
+        return self.partial_fit(X)
+
+    def merge(self, other):
+        """
+        Adds the sketches of a scaler fitted on other rows.
+
+        Args:
+        other: StreamingRobustScaler
+            A scaler fitted on the same columns.
+
+        Returns:
+        StreamingRobustScaler
+            The scaler itself.
+        """
+        self.sketches_.merge(other.sketches_)
+        self._statistics = None
+        return self
+
+    def account_for_imputation(self, values):
+        """
+        Adds the imputed value of every missing entry seen so far, as if the scaler had been fitted on imputed data.
+
+        Lets the imputer and the scaler be fitted in the same pass over the data.
+
+        Args:
+        values: np.ndarray
+            The imputed value of every column.
+
+        Returns:
+        StreamingRobustScaler
+            The scaler itself.
+        """
+        self.sketches_.add_constant(values, self.sketches_.n_missing)
+        self.sketches_.n_missing[:] = 0
+        self._statistics = None
+        return self
+
+    def _get_statistics(self):
+        """
+        Derives center and scale from the sketches when first needed, with RobustScaler's handling of zero ranges.
+        """
+        if getattr(self, '_statistics', None) is None:
+            q_min, q_max = self.quantile_range
+            center = self.sketches_.quantiles(0.5)
+            scale = self.sketches_.quantiles(q_max / 100.0) - self.sketches_.quantiles(q_min / 100.0)
+            scale[~(scale > np.finfo(float).eps * 10)] = 1.0
+            self._statistics = (center, scale)
+        return self._statistics
+
+    @property
+    def center_(self):
+        """
+        Estimated median of every column.
+        """
+        return self._get_statistics()[0]
+
+    @property
+    def scale_(self):
+        """
+        Estimated interquartile range of every column, 1 where it is zero.
+        """
+        return self._get_statistics()[1]
+
+    def transform(self, X):
+        """
+        Centers and scales the data.
+        """
+        X = np.asarray(X, dtype=float)
+        center, scale = self._get_statistics()
+        return (X - center) / scale
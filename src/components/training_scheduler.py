@@ -0,0 +1,201 @@
+from src.logger import Logger
+from src.utils import fit_and_score
+from src.run_config import RunConfig
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+import multiprocessing
+import time
+
+# model classes that can use more than one thread while fitting
+MULTI_THREADED_MODELS = {'RandomForestClassifier', 'XGBClassifier', 'HistGradientBoostingClassifier'}
+
+@dataclass
+class TrainingJob:
+    """
+    A candidate model together with the number of threads it may use.
+
+    Attributes:
+        name: str
+            Name of the model.
+        model: object
+            Model instance to be trained.
+        threads: int
+            Thread budget of the model (n_jobs / nthread, OpenMP and BLAS threads).
+        usage: dict
+            Wall time, cpu time and cpu utilization measured while training.
+
+    """
+    name: str
+    model: object
+    threads: int = 1
+    usage: dict = field(default_factory=dict)
+
+def run_training_job(job, X_train, Y_train, X_test, Y_test):
+    """
+    Trains and scores a single job within its thread budget and measures its cpu usage.
+
+    Runs either in the current process or in a worker process of the scheduler. The cpu time
+    is the one of the whole process, so it includes every thread the model starts.
+
+    Args:
+    job: TrainingJob
+        The job to be run.
+    X_train, Y_train, X_test, Y_test:
+        Training and test features and targets, with targets already encoded as 0/1.
+
+    Returns:
+    tuple
+        A tuple containing the job with the fitted model and its usage, and the AUC-ROC score.
+    """
+    from threadpoolctl import threadpool_limits
+
+    if 'n_jobs' in job.model.get_params():
+        job.model.set_params(n_jobs=job.threads)
+
+    # limit OpenMP (histogram gradient boosting) and BLAS (SVC, logistic regression) threads
+    with threadpool_limits(limits=job.threads):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        _, job.model, auc_score = fit_and_score(job.name, job.model, X_train, Y_train, X_test, Y_test)
+        wall_time, cpu_time = time.perf_counter() - start_wall, time.process_time() - start_cpu
+
+    job.usage = {
+        'threads': job.threads,
+        'wall_time': wall_time,
+        'cpu_time': cpu_time,
+        'cpu_utilization': cpu_time / (wall_time * job.threads) if wall_time > 0 else 0.0,
+    }
+    return job, auc_score
+
+class TrainingScheduler:
+    """
+    A class to train candidate models within the cpu budget of the run.
+
+    Methods:
+    --------
+    __init__(run_config=None):
+        Initializes TrainingScheduler with run configuration and logger.
+
+    plan(models):
+        Gives every model a thread budget and orders the jobs for packing.
+
+    run(models, X_train, Y_train, X_test, Y_test):
+        Trains and scores the models, side by side if the run configuration allows it.
+
+    """
+
+    def __init__(self, run_config=None):
+        """
+        Initializes TrainingScheduler with run configuration and logger.
+
+        Args:
+        run_config: RunConfig, optional (default=None)
+            Run-level configuration with thread counts and cpu budget. A default RunConfig is used if None.
+        """
+        self.run_config = run_config if run_config is not None else RunConfig()
+        self.logger = Logger()
+
+    def plan(self, models):
+        """
+        Gives every model a thread budget and orders the jobs for packing.
+
+        Multi-threaded models get n_jobs threads from the run configuration, the others get one.
+        The widest jobs come first, so the single-threaded ones fill the cores that are left.
+
+        Args:
+        models: dict
+            Dictionary with model names as keys and model instances as values.
+
+        Returns:
+        list
+            A list of TrainingJob.
+        """
+        jobs = []
+        for name, model in models.items():
+            multi_threaded = type(model).__name__ in MULTI_THREADED_MODELS
+            threads = self.run_config.n_jobs if multi_threaded else 1
+            jobs.append(TrainingJob(name=name, model=model, threads=threads))
+
+        return sorted(jobs, key=lambda job: job.threads, reverse=True)
+
+    def run(self, models, X_train, Y_train, X_test, Y_test):
+        """
+        Trains and scores the models, side by side if the run configuration allows it.
+
+        Jobs are started as long as their threads fit into the free cores of the cpu budget.
+
+        Args:
+        models: dict
+            Dictionary with model names as keys and model instances as values.
+            The entries are replaced with the fitted models.
+        X_train: pd.DataFrame
+            Training features.
+        Y_train: pd.Series
+            Training target.
+        X_test: pd.DataFrame
+            Test features.
+        Y_test: pd.Series
+            Test target.
+
+        Returns:
+        tuple
+            A tuple containing a dictionary with the AUC-ROC score of each model and
+            a dictionary with the cpu usage of each model.
+
+        Raises:
+        Exception
+            If any error occurs while training the models.
+        """
+        try:
+            # replace target variables for binary classification
+            Y_train = Y_train.replace({-1:0, 1:1})
+            Y_test = Y_test.replace({-1:0, 1:1})
+
+            jobs = self.plan(models)
+            cpu_budget = self.run_config.cpu_budget
+            results = {}
+
+            if not self.run_config.parallel_models or cpu_budget == 1:
+                self.logger.log(f'Training {len(jobs)} models one after another')
+                for job in jobs:
+                    job, auc_score = run_training_job(job, X_train, Y_train, X_test, Y_test)
+                    results[job.name] = (job, auc_score)
+
+            else:
+                self.logger.log(f'Training {len(jobs)} models side by side on {cpu_budget} cores')
+                pending, running, free_cores = list(jobs), {}, cpu_budget
+
+                # fresh worker processes instead of forks, which could inherit OpenMP and BLAS thread pools
+                # in a locked state when the pipeline runs the training stage on a worker thread
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                with ProcessPoolExecutor(max_workers=cpu_budget, mp_context=multiprocessing.get_context(start_method)) as executor:
+                    while pending or running:
+                        # start every pending job that fits into the free cores
+                        for job in list(pending):
+                            if job.threads <= free_cores or not running:
+                                pending.remove(job)
+                                free_cores -= job.threads
+                                future = executor.submit(run_training_job, job, X_train, Y_train, X_test, Y_test)
+                                running[future] = job
+
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            free_cores += running.pop(future).threads
+                            job, auc_score = future.result()
+                            results[job.name] = (job, auc_score)
+
+            # keep the reports in the order of the models dictionary
+            model_report, usage_report = {}, {}
+            for name in list(models):
+                job, auc_score = results[name]
+                models[name] = job.model
+                model_report[name] = auc_score
+                usage_report[name] = job.usage
+                self.logger.log(f"Model: {name}, threads: {job.usage['threads']}, "
+                                f"wall time: {job.usage['wall_time']:.2f}s, cpu time: {job.usage['cpu_time']:.2f}s, "
+                                f"cpu utilization: {job.usage['cpu_utilization']:.0%}")
+
+            return model_report, usage_report
+
+        except Exception as e:
+            self.logger.log('Error occurred while training the models', 'ERROR')
+            raise e
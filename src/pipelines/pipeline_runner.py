@@ -0,0 +1,182 @@
+from src.logger import Logger
+from src.utils import save_obj, load_obj
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from datetime import datetime
+import os, sys
+import json
+import time
+
+@dataclass
+class PipelineRunnerConfig:
+    """
+    Configuration for pipeline runner
+
+    Attributes:
+        runs_folder: str
+            Folder with one sub-folder of checkpoints and timeline per run.
+        max_workers: int
+            Number of stages that may run at the same time.
+
+    """
+    runs_folder = os.path.join('../artifacts', 'runs')
+    max_workers = 4
+
+@dataclass
+class Stage:
+    """
+    A stage of a pipeline.
+
+    Attributes:
+        name: str
+            Name of the stage, unique within the pipeline.
+        func: callable
+            Called with the outputs of the stages it depends on as keyword arguments, by stage name.
+        depends_on: list
+            Names of the stages whose outputs are needed.
+
+    """
+    name: str
+    func: object
+    depends_on: list = field(default_factory=list)
+
+class PipelineRunner:
+    """
+    A class to run a small DAG of stages with checkpoints, resumption and a timeline.
+
+    Every completed stage checkpoints its output under the run folder. Running the same run
+    again loads the checkpoints instead of repeating the stages, so a crash only repeats the
+    stage that failed. Stages whose dependencies are complete run concurrently.
+
+    Methods:
+    --------
+    __init__(run_id=None):
+        Initializes PipelineRunner with configuration, logger and run folder.
+
+    run(stages):
+        Runs the stages in dependency order and returns the output of every stage.
+
+    """
+
+    def __init__(self, run_id=None):
+        """
+        Initializes PipelineRunner with configuration, logger and run folder.
+
+        Args:
+        run_id: str, optional (default=None)
+            Identifier of the run. Pass the identifier of an earlier run to resume it.
+            A new identifier based on the current time is used if None.
+        """
+        self.pipeline_runner_config = PipelineRunnerConfig()
+        self.logger = Logger()
+        self.run_id = run_id if run_id is not None else datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.run_folder = os.path.join(self.pipeline_runner_config.runs_folder, self.run_id)
+        self.timeline = []
+
+    def _checkpoint_path(self, stage_name):
+        """
+        Path to the checkpoint of a stage.
+        """
+        return os.path.join(self.run_folder, f'{stage_name}.pkl')
+
+    def _run_stage(self, stage, inputs):
+        """
+        Runs a single stage, checkpoints its output and records its timing, also when it fails.
+        """
+        start_time = datetime.now()
+        start = time.perf_counter()
+        entry = {'stage': stage.name, 'status': 'failed', 'start': start_time.isoformat()}
+        self.logger.log(f'Run {self.run_id}: starting stage {stage.name}')
+
+        try:
+            output = stage.func(**inputs)
+
+            # write to a temporary file first, so a crash never leaves a partial checkpoint
+            checkpoint_path = self._checkpoint_path(stage.name)
+            save_obj(checkpoint_path + '.tmp', output)
+            os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+            entry['status'] = 'completed'
+            self.logger.log(f'Run {self.run_id}: stage {stage.name} completed in {time.perf_counter() - start:.2f}s')
+            return output
+
+        except Exception as e:
+            entry['error'] = str(e)
+            raise e
+
+        finally:
+            entry['duration'] = time.perf_counter() - start
+            self.timeline.append(entry)
+
+    def _save_timeline(self):
+        """
+        Writes the timeline of the run next to its checkpoints.
+        """
+        os.makedirs(self.run_folder, exist_ok=True)
+        with open(os.path.join(self.run_folder, 'timeline.json'), 'w') as timeline_file:
+            json.dump(self.timeline, timeline_file, indent=4)
+
+    def run(self, stages):
+        """
+        Runs the stages in dependency order and returns the output of every stage.
+
+        Args:
+        stages: list
+            The stages of the pipeline.
+
+        Returns:
+        dict
+            A dictionary with stage names as keys and stage outputs as values.
+
+        Raises:
+        Exception
+            If a stage fails or the dependencies cannot be resolved. Completed stages keep their checkpoints.
+        """
+        try:
+            self.logger.log(f'Run {self.run_id}: running {len(stages)} stages under {self.run_folder}')
+            os.makedirs(self.run_folder, exist_ok=True)
+            stage_names = {stage.name for stage in stages}
+            for stage in stages:
+                missing = set(stage.depends_on) - stage_names
+                if missing:
+                    raise ValueError(f'Stage {stage.name} depends on unknown stages {sorted(missing)}')
+
+            outputs = {}
+
+            # resume: load the stages completed by an earlier attempt of this run
+            for stage in stages:
+                if os.path.exists(self._checkpoint_path(stage.name)):
+                    outputs[stage.name] = load_obj(self._checkpoint_path(stage.name))
+                    self.timeline.append({'stage': stage.name, 'status': 'resumed from checkpoint',
+                                          'start': datetime.now().isoformat(), 'duration': 0.0})
+                    self.logger.log(f'Run {self.run_id}: stage {stage.name} resumed from checkpoint')
+
+            pending = [stage for stage in stages if stage.name not in outputs]
+            running = {}
+
+            with ThreadPoolExecutor(max_workers=self.pipeline_runner_config.max_workers) as executor:
+                while pending or running:
+                    # start every stage whose dependencies are complete
+                    for stage in list(pending):
+                        if all(name in outputs for name in stage.depends_on):
+                            pending.remove(stage)
+                            inputs = {name: outputs[name] for name in stage.depends_on}
+                            running[executor.submit(self._run_stage, stage, inputs)] = stage
+
+                    if not running:
+                        raise ValueError(f'Stages {[stage.name for stage in pending]} have circular dependencies')
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        outputs[stage.name] = future.result()
+
+            self.logger.log(f'Run {self.run_id}: all stages completed')
+            return outputs
+
+        except Exception as e:
+            self.logger.log(f'Run {self.run_id}: error occurred while running the pipeline', 'ERROR')
+            raise e
+
+        finally:
+            self._save_timeline()
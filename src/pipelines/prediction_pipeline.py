@@ -1,6 +1,9 @@
 from src.logger import Logger
 from src.utils import load_obj
+from src.components.prediction_store import PredictionStore
+from src.components.model_explainer import ModelExplainer
 import os, sys
+import hashlib
 import pandas as pd
 from dataclasses import dataclass
 
@@ -18,12 +21,21 @@ class PredictionPipelineConfig:
             Path to the features required/used.
         predictions_path: str   
             Path to the predictions.
+        store_path: str
+            Path to the prediction store.
+        wafer_id_column: str
+            Column of the input data with the wafer IDs.
+        lot_column: str
+            Column of the input data with the lots, if any.
 
     """
     preprocessor_path = os.path.join('artifacts', 'preprocessor.pkl')
     model_path = os.path.join('artifacts', 'model.pkl')
     features_path = os.path.join('artifacts', 'features.pkl')
     predictions_path = os.path.join('predictions', 'predictions.csv')
+    store_path = os.path.join('predictions', 'predictions.db')
+    wafer_id_column = 'Unnamed: 0'
+    lot_column = 'Lot'
 
 
 class PredictionPipeline:
@@ -34,53 +46,261 @@ class PredictionPipeline:
         """
         self.logger = Logger()
         self.prediction_config = PredictionPipelineConfig()
+        self.preprocessor = None
+        self.model = None
+        self.features = None
+        self.model_version = None
+        self.store = None
+        self.explainer = None
 
-    def predict(self, df):
+    def load_artifacts(self):
         """
-        Predicts outcomes based on input features data.
+        Loads the preprocessor, model and features once and keeps them for the following predictions.
 
-        Args:
-        df: pd.DataFrame
-            Features data for which predictions have to be made.
-
-        Returns:
-        pred: pd.DataFrame
-            Predictions for the input data.    
+        Raises:
+        Exception
+            If any error occurs while loading the artifacts.
         """
+        if self.model is not None:
+            return
 
         try:
-
             # load preprocessor
             self.logger.log('Loading preprocessor...')
-            preprocessor = load_obj(self.prediction_config.preprocessor_path)
+            self.preprocessor = load_obj(self.prediction_config.preprocessor_path)
             self.logger.log('Preprocessor loaded successfully.')
 
-           # load model
+            # load model
             self.logger.log('Loading Model...')
-            model = load_obj(self.prediction_config.model_path)
+            self.model = load_obj(self.prediction_config.model_path)
             self.logger.log('Model loaded successfully.')
 
+            # the model version is the hash of the model artifact
+            with open(self.prediction_config.model_path, 'rb') as model_file:
+                self.model_version = hashlib.sha256(model_file.read()).hexdigest()[:12]
+
             # load features
             self.logger.log('Loading Features...')
-            features = load_obj(self.prediction_config.features_path)
+            self.features = load_obj(self.prediction_config.features_path)
             self.logger.log('Features loaded successfully.')
 
-            # extract the required features from df
-            self.logger.log('Extracting the required features from input data...')
-            data_features = df[features]
-            self.logger.log('Extracted the required features.')
+        except Exception as e:
+            self.logger.log('Error occurred while loading the artifacts', 'ERROR')
+            raise e
+
+    def transform(self, df):
+        """
+        Extracts the required features from the input data and preprocesses them.
+
+        Args:
+        df: pd.DataFrame
+            Features data for which predictions have to be made.
+
+        Returns:
+        np.ndarray
+            The preprocessed features.
+        """
+        self.load_artifacts()
+
+        # extract the required features from df
+        data_features = df[self.features]
+
+        # preprocess data
+        return self.preprocessor.transform(data_features)
+
+    def score_features(self, data_features, index=None, with_probability=False, model=None):
+        """
+        Predicts the outcomes of already preprocessed features.
+
+        Labels always come from model.predict, also when probabilities are asked for: the calibrated
+        probabilities of SVC can disagree with its predictions.
 
-            # preprocess data
-            self.logger.log('Performing preprocessing steps...')
-            data_features = preprocessor.transform(data_features)
-            self.logger.log('Preprocessing completed successfully.')
+        Args:
+        data_features: np.ndarray
+            Preprocessed features.
+        index: pd.Index, optional (default=None)
+            Index of the predictions, usually the index of the input data.
+        with_probability: bool, optional (default=False)
+            Whether to add the probability of the faulty class as a 'Probability' column.
+        model: object, optional (default=None)
+            The model to score with. The loaded model is used if None.
 
-            # predict
+        Returns:
+        pred: pd.DataFrame
+            Predictions for the features.
+        """
+        model = model if model is not None else self.model
+
+        pred = pd.DataFrame(model.predict(data_features), columns=['Predictions'], index=index)
+        if with_probability:
+            pred['Probability'] = model.predict_proba(data_features)[:, 1]
+        return pred
+
+    def score(self, df, with_probability=False):
+        """
+        Preprocesses the input features data and predicts the outcomes without saving them.
+
+        Args:
+        df: pd.DataFrame
+            Features data for which predictions have to be made.
+        with_probability: bool, optional (default=False)
+            Whether to add the probability of the faulty class as a 'Probability' column.
+
+        Returns:
+        pred: pd.DataFrame
+            Predictions for the input data.
+        """
+        # preprocess data
+        data_features = self.transform(df)
+
+        # predict
+        return self.score_features(data_features, df.index, with_probability)
+
+    def store_predictions(self, df, pred, model_version=None):
+        """
+        Appends predictions to the prediction store together with the wafer IDs and lots of the input data.
+
+        Wafer IDs are never made up: without the wafer ID column the predictions are not stored.
+
+        Args:
+        df: pd.DataFrame
+            Input data the predictions were made for.
+        pred: pd.DataFrame
+            Predictions with 'Predictions' and, optionally, 'Probability' columns.
+        model_version: str, optional (default=None)
+            Version of the model that made the predictions. The version of the loaded model is used if None.
+
+        Returns:
+        bool
+            Whether the predictions were stored.
+        """
+        wafer_id_column, lot_column = self.prediction_config.wafer_id_column, self.prediction_config.lot_column
+        if wafer_id_column not in df.columns:
+            self.logger.log(f"Predictions not stored: the input data has no '{wafer_id_column}' column with the wafer IDs",
+                            'WARNING')
+            return False
+
+        if self.store is None:
+            self.store = PredictionStore(self.prediction_config.store_path)
+
+        wafer_ids = df[wafer_id_column]
+        lots = df[lot_column] if lot_column in df.columns else None
+        probabilities = pred['Probability'] if 'Probability' in pred.columns else None
+
+        self.store.write(wafer_ids=list(wafer_ids), labels=list(pred['Predictions']),
+                         probabilities=None if probabilities is None else list(probabilities),
+                         model_version=model_version or self.model_version,
+                         lots=None if lots is None else list(lots))
+        return True
+
+    def explain(self, df, top_k=None):
+        """
+        Returns the sensors that drove the prediction of every wafer.
+
+        The explainer of the model is built on the first call and reused afterwards. XGBoost gets
+        TreeSHAP values, the other tree models path (Saabas) attributions and logistic regression
+        linear attributions, each in the units of its own model output. The two kinds of tree
+        attribution distribute the output differently, so attributions cannot be compared across
+        model types, only across wafers scored by the same model.
+
+        Args:
+        df: pd.DataFrame
+            Features data for which predictions have to be explained.
+        top_k: int, optional (default=None)
+            Number of sensors per wafer. The configured number of the explainer is used if None.
+
+        Returns:
+        pd.DataFrame
+            One row per wafer with 'Sensor i' and 'Attribution i' columns, or None if the
+            model is not supported.
+        """
+        try:
+            data_features = self.transform(df)
+
+            if not ModelExplainer.supported(self.model):
+                self.logger.log(f'Attributions are not supported for {type(self.model).__name__}', 'WARNING')
+                return None
+
+            if self.explainer is None:
+                self.explainer = ModelExplainer(self.model, self.features)
+
+            top_sensors = self.explainer.top_sensors(data_features, top_k)
+            top_sensors.index = df.index
+            return top_sensors
+
+        except Exception as e:
+            self.logger.log('Error occurred while explaining the predictions', 'ERROR')
+            raise e
+
+    def predict_in_chunks(self, df, chunk_size=10000, progress_callback=None, store=False):
+        """
+        Predicts outcomes chunk by chunk, so large inputs never go through the preprocessor at once.
+
+        Args:
+        df: pd.DataFrame
+            Features data for which predictions have to be made.
+        chunk_size: int, optional (default=10000)
+            Number of rows scored at a time.
+        progress_callback: callable, optional (default=None)
+            Called with the number of rows scored so far and the total number of rows after each chunk.
+        store: bool, optional (default=False)
+            Whether to append the predictions of each chunk to the prediction store.
+
+        Yields:
+        pd.DataFrame
+            Predictions for each chunk of the input data.
+        """
+        try:
+            self.load_artifacts()
+            n_rows = len(df)
+            self.logger.log(f'Started chunked prediction of {n_rows} rows...')
+
+            for start in range(0, n_rows, chunk_size):
+                chunk = df.iloc[start:start + chunk_size]
+                pred = self.score(chunk, with_probability=store)
+                if store:
+                    self.store_predictions(chunk, pred)
+                    pred = pred[['Predictions']]
+                if progress_callback is not None:
+                    progress_callback(min(start + chunk_size, n_rows), n_rows)
+                yield pred
+
+            self.logger.log('Chunked prediction completed successfully.')
+
+        except Exception as e:
+            self.logger.log('Error occurred during chunked prediction', 'ERROR')
+            raise e
+
+    def predict(self, df, store=True):
+        """
+        Predicts outcomes based on input features data.
+
+        Args:
+        df: pd.DataFrame
+            Features data for which predictions have to be made.
+        store: bool, optional (default=True)
+            Whether to append the predictions to the prediction store.
+
+        Returns:
+        pred: pd.DataFrame
+            Predictions for the input data.    
+        """
+
+        try:
+
+            # load preprocessor, model and features
+            self.load_artifacts()
+
+            # preprocess data and predict
             self.logger.log('Started prediction...')
-            pred = model.predict(data_features)
-            pred = pd.DataFrame(pred, columns=['Predictions'])
+            pred = self.score(df, with_probability=store)
             self.logger.log('Prediction completed successfully.')
 
+            # append predictions to the store
+            if store:
+                self.store_predictions(df, pred)
+            pred = pred[['Predictions']].reset_index(drop=True)
+
             # save predictions
             pred.to_csv(self.prediction_config.predictions_path, index=False, header=True)
             return pred
@@ -0,0 +1,23 @@
+from src.logger import Logger
+from src.components.model_refresher import ModelRefresher
+from src.run_config import RunConfig
+import os, sys
+
+if __name__ == '__main__':
+    logger = Logger()
+
+    # one run configuration shared by all the stages
+    run_config = RunConfig()
+    run_config.seed_everything()
+
+    try:
+        # refresh the model with the new labelled wafers given on the command line
+        model_refresher = ModelRefresher(run_config)
+        for new_data_path in sys.argv[1:]:
+            promoted = model_refresher.initiate_model_refresh(new_data_path)
+            print(f'{new_data_path}: refreshed model {"promoted" if promoted else "not promoted"}.')
+        print('Model refresh completed.')
+
+    except Exception as e:
+        logger.log('Error occurred during model refresh', 'ERROR')
+        raise e
@@ -0,0 +1,207 @@
+from src.logger import Logger
+from src.utils import load_obj
+from src.pipelines.prediction_pipeline import PredictionPipeline
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import os, sys
+import hashlib
+import threading
+import time
+import pandas as pd
+
+@dataclass
+class ShadowPipelineConfig:
+    """
+    Configuration for shadow prediction pipeline
+
+    Attributes:
+        comparison_path: str
+            Path to the csv file with the side by side comparison of the models.
+        store_shadow_predictions: bool
+            Whether the predictions of the shadow models are appended to the prediction store.
+        max_pending_batches: int
+            Number of batches that may wait for the shadow models. Further batches are not shadowed.
+
+    """
+    comparison_path = os.path.join('predictions', 'shadow_comparison.csv')
+    store_shadow_predictions = True
+    max_pending_batches = 4
+
+class ShadowPipeline:
+    """
+    A class to score every batch with the primary model and any number of shadow models.
+
+    The batch is preprocessed once by the primary pipeline and the same array is fed to all the models.
+    Shadow models run on a separate worker, so the caller only waits for the primary model.
+    When the shadow models fall behind, new batches are skipped and counted rather than queued,
+    so the pending batches never hold more than a bounded amount of memory.
+
+    Methods:
+    --------
+    __init__(pipeline=None):
+        Initializes ShadowPipeline with the primary pipeline, configuration, logger and shadow worker.
+
+    register_model(name, model_path):
+        Loads a candidate model and scores it in the shadow of the primary model.
+
+    predict(df):
+        Predicts outcomes with the primary model and hands the batch to the shadow models.
+
+    comparison_report():
+        Waits for the shadow worker and returns the side by side comparison of the models.
+
+    close():
+        Waits for the shadow worker, saves the comparison and stops the worker.
+
+    """
+
+    def __init__(self, pipeline=None):
+        """
+        Initializes ShadowPipeline with the primary pipeline, configuration, logger and shadow worker.
+
+        Args:
+        pipeline: PredictionPipeline, optional (default=None)
+            The primary pipeline. A new PredictionPipeline is used if None.
+        """
+        self.pipeline = pipeline if pipeline is not None else PredictionPipeline()
+        self.shadow_config = ShadowPipelineConfig()
+        self.logger = Logger()
+        self.shadow_models = {}
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = []
+        self.comparisons = []
+        self.lock = threading.Lock()
+        self.n_batches = 0
+        self.n_skipped_batches = 0
+
+    def register_model(self, name, model_path):
+        """
+        Loads a candidate model and scores it in the shadow of the primary model.
+
+        The model must have been trained on the output of the primary preprocessor.
+
+        Args:
+        name: str
+            Name of the shadow model.
+        model_path: str
+            Path to the pickled model.
+        """
+        try:
+            model = load_obj(model_path)
+            with open(model_path, 'rb') as model_file:
+                version = hashlib.sha256(model_file.read()).hexdigest()[:12]
+
+            self.shadow_models[name] = (model, version)
+            self.logger.log(f'Registered shadow model {name}, version {version}')
+
+        except Exception as e:
+            self.logger.log(f'Error occurred while registering shadow model {name}', 'ERROR')
+            raise e
+
+    def predict(self, df):
+        """
+        Predicts outcomes with the primary model and hands the batch to the shadow models.
+
+        Args:
+        df: pd.DataFrame
+            Features data for which predictions have to be made.
+
+        Returns:
+        pred: pd.DataFrame
+            Predictions of the primary model for the input data.
+        """
+        try:
+            start = time.perf_counter()
+
+            # preprocess once for all the models
+            data_features = self.pipeline.transform(df)
+
+            pred = self.pipeline.score_features(data_features, df.index, with_probability=True)
+            primary_latency = time.perf_counter() - start
+
+            self.pipeline.store_predictions(df, pred)
+
+            # score the shadow models off the primary path
+            self.n_batches += 1
+            self.pending = [future for future in self.pending if not future.done()]
+            if self.shadow_models and len(self.pending) >= self.shadow_config.max_pending_batches:
+                self.n_skipped_batches += 1
+                self.logger.log(f'Batch {self.n_batches}: shadow models are {len(self.pending)} batches behind, '
+                                f'skipping the batch ({self.n_skipped_batches} skipped so far)', 'WARNING')
+            elif self.shadow_models:
+                self.pending.append(self.executor.submit(self._score_shadows, self.n_batches, df,
+                                                         data_features, pred, primary_latency))
+
+            return pred[['Predictions']].reset_index(drop=True)
+
+        except Exception as e:
+            self.logger.log('Error occurred during shadow prediction', 'ERROR')
+            raise e
+
+    def _score_shadows(self, batch, df, data_features, primary_pred, primary_latency):
+        """
+        Scores a preprocessed batch with every shadow model and records the disagreement with the primary model.
+
+        Runs on the shadow worker.
+        """
+        for name, (model, version) in self.shadow_models.items():
+            try:
+                start = time.perf_counter()
+                pred = self.pipeline.score_features(data_features, df.index, with_probability=True, model=model)
+                latency = time.perf_counter() - start
+
+                if self.shadow_config.store_shadow_predictions:
+                    self.pipeline.store_predictions(df, pred, model_version=version)
+
+                # disagreement of the labels of model.predict, not of the most probable classes
+                disagreement = float((pred['Predictions'].to_numpy() != primary_pred['Predictions'].to_numpy()).mean())
+                comparison = {
+                    'batch': batch,
+                    'rows': len(df),
+                    'primary_version': self.pipeline.model_version,
+                    'shadow_model': name,
+                    'shadow_version': version,
+                    'disagreement': disagreement,
+                    'mean_probability_difference': float((pred['Probability'] - primary_pred['Probability']).abs().mean()),
+                    'primary_latency': primary_latency,
+                    'shadow_latency': latency,
+                }
+                with self.lock:
+                    self.comparisons.append(comparison)
+
+                self.logger.log(f'Batch {batch}: shadow model {name} disagrees on {disagreement:.2%} of {len(df)} rows, '
+                                f'latency primary {primary_latency:.3f}s, shadow {latency:.3f}s')
+
+            except Exception as e:
+                # a failing shadow model must never affect the primary path
+                self.logger.log(f'Error occurred while scoring shadow model {name}: {str(e)}', 'ERROR')
+
+    def comparison_report(self):
+        """
+        Waits for the shadow worker and returns the side by side comparison of the models.
+
+        Returns:
+        pd.DataFrame
+            One row per batch and shadow model with disagreement and latencies.
+        """
+        for future in self.pending:
+            future.result()
+        self.pending = []
+
+        with self.lock:
+            return pd.DataFrame(self.comparisons)
+
+    def close(self):
+        """
+        Waits for the shadow worker, saves the comparison and stops the worker.
+        """
+        report = self.comparison_report()
+        self.executor.shutdown(wait=True)
+
+        if self.n_skipped_batches:
+            self.logger.log(f'Shadow models skipped {self.n_skipped_batches} of {self.n_batches} batches', 'WARNING')
+
+        if not report.empty:
+            os.makedirs(os.path.dirname(self.shadow_config.comparison_path), exist_ok=True)
+            report.to_csv(self.shadow_config.comparison_path, index=False, header=True)
+            self.logger.log(f'Saved shadow comparison under {self.shadow_config.comparison_path}')
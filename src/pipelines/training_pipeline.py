@@ -1,47 +1,120 @@
 from src.logger import Logger
 from src.components.data_ingestion import DataIngestion
-from src.components.data_transformation import DataTransformation
-from src.components.model_trainer import ModelTrainer
+from src.components.data_transformation import DataTransformation, DataTransformationConfig
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfg
+from src.pipelines.pipeline_runner import PipelineRunner, Stage
+from src.run_config import RunConfig
 import os, sys
+import shutil
 
-if __name__ == '__main__':
-    logger = Logger()
+def ingest_data(run_config, run_folder):
+    """
+    Ingestion stage: loads, cleans and splits the raw data.
 
-    try:
-        # data ingestion
-        data_ingestion = DataIngestion()
-        train_path, test_path = data_ingestion.initiate_data_ingestion()
-        print(f'train_path: {train_path}\n test_path: {test_path}')
-        print('Data ingestion completed.')
+    The split is copied into the run folder, since later runs overwrite the shared train and test files.
+    """
+    data_ingestion = DataIngestion(run_config)
+    train_path, test_path = data_ingestion.initiate_data_ingestion()
+    train_path = shutil.copy(train_path, os.path.join(run_folder, 'train.csv'))
+    test_path = shutil.copy(test_path, os.path.join(run_folder, 'test.csv'))
+    print(f'train_path: {train_path}\n test_path: {test_path}')
+    print('Data ingestion completed.')
+    return train_path, test_path
 
-    except Exception as e:
-        logger.log('Error occurred during data ingestion', 'ERROR')
-        raise e
+def transform_data(run_config, run_folder, ingestion):
+    """
+    Transformation stage: preprocesses and resamples the train and test data.
 
-    try:
-        # data transformation
-        data_transformation = DataTransformation() 
-        train_data, test_data = data_transformation.initiate_data_transformation(train_path, test_path)
+    The preprocessor, the features and the imputer neighbours are saved in the run folder,
+    so a resumed run trains on the preprocessor it fitted itself.
+    """
+    train_path, test_path = ingestion
+    data_transformation = DataTransformation(run_config)
+    config = data_transformation.data_transformation_config
+    config.preprocessor_file_path = os.path.join(run_folder, 'preprocessor.pkl')
+    config.used_features = os.path.join(run_folder, 'features.pkl')
+    config.imputer_data_path = os.path.join(run_folder, 'imputer_neighbours.csv')
+    train_data, test_data = data_transformation.initiate_data_transformation(train_path, test_path)
+    print('Data transformation completed.')
+    return train_data, test_data
 
-        #separate features and taget variable
-        X_train = train_data.drop('Good/Bad', axis=1)
-        Y_train = train_data['Good/Bad']
+def train_models(run_config, run_folder, transformation):
+    """
+    Training stage: trains and evaluates the candidate models and saves the best one in the run folder.
+    """
+    train_data, test_data = transformation
 
-        X_test = test_data.drop('Good/Bad', axis=1)
-        Y_test = test_data['Good/Bad']
+    #separate features and taget variable
+    X_train = train_data.drop('Good/Bad', axis=1)
+    Y_train = train_data['Good/Bad']
 
-        print('Data transformation completed.')
+    X_test = test_data.drop('Good/Bad', axis=1)
+    Y_test = test_data['Good/Bad']
 
-    except Exception as e:
-        logger.log('Error occurred during data transformation', 'ERROR')
-        raise e
+    model_trainer = ModelTrainer(run_config)
+    model_trainer.model_trainer_config.trained_model_file_path = os.path.join(run_folder, 'model.pkl')
+    model_trainer.initiate_model_training(X_train, Y_train, X_test, Y_test) 
+    print('Model training completed.')   
+    return model_trainer.model_usage
+
+def publish_artifacts(run_folder):
+    """
+    Publishing stage: copies the preprocessor, features, imputer neighbours and model of the run to the artifacts.
+
+    Everything is copied next to its destination first and then moved into place, so the published
+    model always comes with the preprocessor it was trained on.
+    """
+    data_transformation_config, model_trainer_config = DataTransformationConfig(), ModelTrainerConfg()
+    artifacts = {
+        'preprocessor.pkl': data_transformation_config.preprocessor_file_path,
+        'features.pkl': data_transformation_config.used_features,
+        'imputer_neighbours.csv': data_transformation_config.imputer_data_path,
+        'model.pkl': model_trainer_config.trained_model_file_path,
+    }
+
+    published, stale = [], []
+    for name, destination in artifacts.items():
+        if os.path.exists(os.path.join(run_folder, name)):
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy(os.path.join(run_folder, name), destination + '.tmp')
+            published.append(destination)
+        else:
+            stale.append(destination)
+
+    for destination in published:
+        os.replace(destination + '.tmp', destination)
+
+    # a streaming preprocessor has no imputer neighbours, those of an earlier run must not outlive it
+    for destination in stale:
+        if os.path.exists(destination):
+            os.remove(destination)
+    print(f'Published {len(published)} artifacts of the run.')
+    return published
+
+if __name__ == '__main__':
+    logger = Logger()
+
+    # one run configuration shared by all the stages, candidate models train side by side
+    run_config = RunConfig(parallel_models=True)
+    run_config.seed_everything()
+
+    # pass the id of a failed run to resume it from its last completed stage
+    run_id = sys.argv[1] if len(sys.argv) > 1 else None
+
+    pipeline_runner = PipelineRunner(run_id)
+    stages = [
+        Stage('ingestion', lambda: ingest_data(run_config, pipeline_runner.run_folder)),
+        Stage('transformation', lambda ingestion: transform_data(run_config, pipeline_runner.run_folder, ingestion),
+              depends_on=['ingestion']),
+        Stage('training', lambda transformation: train_models(run_config, pipeline_runner.run_folder, transformation),
+              depends_on=['transformation']),
+        Stage('publishing', lambda training: publish_artifacts(pipeline_runner.run_folder), depends_on=['training']),
+    ]
 
     try:
-        # train model
-        model_trainer = ModelTrainer()
-        model_trainer.initiate_model_training(X_train, Y_train, X_test, Y_test) 
-        print('Model training completed.')   
+        pipeline_runner.run(stages)
+        print(f'Run {pipeline_runner.run_id} completed, timeline under {pipeline_runner.run_folder}')
 
     except Exception as e:
-        logger.log('Error occurred during model training', 'ERROR')
+        logger.log('Error occurred during training pipeline', 'ERROR')
         raise e
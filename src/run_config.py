@@ -0,0 +1,79 @@
+import os
+import random
+import numpy as np
+from dataclasses import dataclass
+
+@dataclass
+class RunConfig:
+    """
+    Run-level configuration shared by data ingestion, data transformation and model training.
+
+    Two runs with the same RunConfig produce the same train/test split, the same resampled
+    training data and the same fitted models.
+
+    Attributes:
+        seed: int
+            Master seed of the run. Every other seed is derived from it.
+        n_jobs: int
+            Number of threads given to a multi-threaded model (n_jobs / nthread). Defaults to the cpu budget.
+        cpu_budget: int
+            Total number of cores the run is allowed to use. Defaults to all available cores.
+        parallel_models: bool
+            Whether candidate models are trained side by side within the cpu budget.
+
+    """
+    seed: int = 42
+    n_jobs: int = None
+    cpu_budget: int = None
+    parallel_models: bool = False
+
+    def __post_init__(self):
+        """
+        Resolves the cpu budget and keeps the per-model thread count within it.
+        """
+        available_cpus = os.cpu_count() or 1
+        if self.cpu_budget is None or self.cpu_budget < 1:
+            self.cpu_budget = available_cpus
+        self.cpu_budget = min(self.cpu_budget, available_cpus)
+        if self.n_jobs is None or self.n_jobs < 1:
+            self.n_jobs = self.cpu_budget
+        self.n_jobs = min(self.n_jobs, self.cpu_budget)
+
+    def seed_everything(self):
+        """
+        Seeds the global python and numpy random generators with the master seed.
+        """
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+
+    def spawn_seeds(self, n_seeds):
+        """
+        Derives independent seeds from the master seed.
+
+        Args:
+        n_seeds: int
+            Number of seeds to derive.
+
+        Returns:
+        list
+            A list of integer seeds, the same for every run with the same master seed.
+        """
+        children = np.random.SeedSequence(self.seed).spawn(n_seeds)
+        return [int(child.generate_state(1)[0]) for child in children]
+
+    def worker_seeds(self, names):
+        """
+        Derives one independent seed per named worker, e.g. per candidate model.
+
+        The seed of a worker depends only on the master seed and its position in names,
+        so it does not change with the order in which parallel workers are scheduled.
+
+        Args:
+        names: list
+            Names of the workers.
+
+        Returns:
+        dict
+            A dictionary with worker names as keys and their seeds as values.
+        """
+        return dict(zip(names, self.spawn_seeds(len(names))))
@@ -1,10 +1,9 @@
 import pickle
-import pandas as pd
 from src.logger import Logger
 import os, sys
-import streamlit as st
-from sklearn.metrics import accuracy_score
-from sklearn.metrics import roc_auc_score
+
+# streamlit and scikit-learn are imported inside the functions that need them,
+# so the prediction path does not pay for them at startup
 
 
 logger = Logger()
@@ -68,61 +67,41 @@ def load_obj(file_path):
         logger.log('Error occurred while loading the object', 'ERROR')
         raise e    
     
-def evaluate_model(X_train, Y_train, X_test, Y_test, models): 
+def fit_and_score(name, model, X_train, Y_train, X_test, Y_test):
     """
-    Evaluates multiple models using AUC-ROC curve.
+    Trains a single model and computes its AUC-ROC score.
 
     Args:
-    X_train: pd.DataFrame
-        Training features.
-    Y_train: pd.Series
-        Training target.
-    X_test: pd.DataFrame
-        Test features.
-    Y_test: pd.Series
-        Test target.
-    models: dict
-        Dictionary with model names as keys and model instances as values.
+    name: str
+        Name of the model.
+    model: object
+        Model instance to be trained.
+    X_train, Y_train, X_test, Y_test:
+        Training and test features and targets, with targets already encoded as 0/1.
 
     Returns:
-    dict
-        A dictionary with model names as keys and their corresponding AUC-ROC score as values.
-
-    Raises:
-    Exception
-        If any error occurs during evaluation process.                        
+    tuple
+        A tuple containing the model name, the fitted model and its AUC-ROC score.
     """
-    try:
-        logger.log('Starting model evaluation...')
+    from sklearn.metrics import roc_auc_score
 
-        # replace target variables for binary classification
-        Y_train = Y_train.replace({-1:0, 1:1})
-        Y_test = Y_test.replace({-1:0, 1:1})
-        model_report = {}
+    logger.log(f'Training model: {name}')
 
-        for name, model in models.items():
-            logger.log(f'Training model: {name}')
+    # train the model
+    model.fit(X_train, Y_train)
 
-            # train the model
-            model.fit(X_train, Y_train)
+    # predict probabilites
+    Y_pred_proba = model.predict_proba(X_test)[:, 1]
 
-            # predict probabilites
-            Y_pred_proba = model.predict_proba(X_test)[:, 1]
+    # evaluate model
+    auc_score = roc_auc_score(Y_test, Y_pred_proba)
 
-            # evaluate model
-            auc_score = roc_auc_score(Y_test, Y_pred_proba)
-            model_report[name] = auc_score
-
-            logger.log(f'Model: {name}, AUC-ROC score: {auc_score}')
-        
-        logger.log('Model evaluation completed successfully.')
-        return model_report
-
-    except Exception as e:
-        logger.log('Error occurred during model evaluation.')
-        raise e       
+    logger.log(f'Model: {name}, AUC-ROC score: {auc_score}')
+    return name, model, auc_score
 
 def about_me():
+        import streamlit as st
+
         st.title("About the Creator")
         c1, c2 = st.columns([1,1])
         c1.markdown("""Hey! My name is **Geetha Venkatesh**, a passionate data scientist transitioning from academia to industry.